@@ -8,6 +8,7 @@ from sqlalchemy.ext.asyncio import async_engine_from_config
 
 from app.core.config import settings
 from app.models import Base
+from app.services.partitions import is_partition_name
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -22,6 +23,18 @@ target_metadata = Base.metadata
 config.set_main_option("sqlalchemy.url", settings.db_url)
 
 
+def include_object(object, name, type_, reflected, compare_to):
+    """
+    Leave the partitions of time-partitioned tables out of autogenerate.
+
+    They are created and removed by app.services.partitions and have no
+    models, so Alembic would otherwise emit a drop for each of them.
+    """
+    if type_ == "table" and reflected and compare_to is None:
+        return not is_partition_name(name)
+    return True
+
+
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
 # my_important_option = config.get_main_option("my_important_option")
@@ -46,6 +59,7 @@ def run_migrations_offline() -> None:
         target_metadata=target_metadata,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
+        include_object=include_object,
     )
 
     with context.begin_transaction():
@@ -53,7 +67,11 @@ def run_migrations_offline() -> None:
 
 
 def do_run_migrations(connection: Connection) -> None:
-    context.configure(connection=connection, target_metadata=target_metadata)
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        include_object=include_object,
+    )
 
     with context.begin_transaction():
         context.run_migrations()
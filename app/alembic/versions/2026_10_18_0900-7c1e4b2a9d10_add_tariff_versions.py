@@ -0,0 +1,32 @@
+"""add tariff versions
+
+Revision ID: 7c1e4b2a9d10
+Revises: 254a5b0cbac2
+Create Date: 2026-10-18 09:00:12.418233
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "7c1e4b2a9d10"
+down_revision: Union[str, None] = "254a5b0cbac2"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    tariff_versions = op.create_table(
+        "tariff_versions",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("version", sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.bulk_insert(tariff_versions, [{"id": 1, "version": 0}])
+
+
+def downgrade() -> None:
+    op.drop_table("tariff_versions")
@@ -0,0 +1,34 @@
+"""add tariff listing indexes
+
+Revision ID: a94d0e7b2c63
+Revises: 3f8a2d6c51e4
+Create Date: 2026-10-18 10:00:07.902114
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "a94d0e7b2c63"
+down_revision: Union[str, None] = "3f8a2d6c51e4"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_tariffs_cargo_type_id", "tariffs", ["cargo_type", "id"], unique=False
+    )
+    op.create_index(
+        "ix_tariffs_valid_from_valid_to",
+        "tariffs",
+        ["valid_from", "valid_to"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_tariffs_valid_from_valid_to", table_name="tariffs")
+    op.drop_index("ix_tariffs_cargo_type_id", table_name="tariffs")
@@ -0,0 +1,31 @@
+"""add tariff period covering index
+
+Revision ID: 5be7c90f1a28
+Revises: a94d0e7b2c63
+Create Date: 2026-10-18 10:30:55.114870
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "5be7c90f1a28"
+down_revision: Union[str, None] = "a94d0e7b2c63"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_tariffs_cargo_type_period",
+        "tariffs",
+        ["cargo_type", "valid_from", "valid_to"],
+        unique=False,
+        postgresql_include=["id", "rate"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_tariffs_cargo_type_period", table_name="tariffs")
@@ -0,0 +1,44 @@
+"""add tariff period exclusion constraint
+
+Revision ID: c2d84e1f6b37
+Revises: 5be7c90f1a28
+Create Date: 2026-10-18 11:00:12.408311
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "c2d84e1f6b37"
+down_revision: Union[str, None] = "5be7c90f1a28"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS btree_gist")
+    # btree_gist has no operator class for enums; compare cargo types as text
+    # through an immutable wrapper so the expression can be indexed.
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION cargotype_key(cargotype) RETURNS text
+        LANGUAGE sql IMMUTABLE PARALLEL SAFE
+        AS 'SELECT $1::text'
+        """
+    )
+    op.execute(
+        """
+        ALTER TABLE tariffs ADD CONSTRAINT tariffs_no_overlapping_periods
+        EXCLUDE USING gist (
+            cargotype_key(cargo_type) WITH =,
+            daterange(valid_from, valid_to, '[]') WITH &&
+        )
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_constraint("tariffs_no_overlapping_periods", "tariffs", type_="exclude")
+    op.execute("DROP FUNCTION IF EXISTS cargotype_key(cargotype)")
@@ -0,0 +1,118 @@
+"""partition action_logs and insurance_requests by month
+
+Revision ID: 8d3f6a1c7e25
+Revises: e71b3c5d9a42
+Create Date: 2026-10-18 12:00:41.730215
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "8d3f6a1c7e25"
+down_revision: Union[str, None] = "e71b3c5d9a42"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Months created ahead of the current one; the maintenance job keeps the
+# horizon from then on (see app.services.partitions).
+PREMAKE_MONTHS = 3
+
+COLUMNS = {
+    "action_logs": """
+        id integer NOT NULL DEFAULT nextval('action_logs_id_seq'),
+        action varchar NOT NULL,
+        payload json NOT NULL,
+        timestamp timestamp without time zone NOT NULL,
+        user_id integer
+    """,
+    "insurance_requests": """
+        id integer NOT NULL DEFAULT nextval('insurance_requests_id_seq'),
+        cargo_type cargotype NOT NULL,
+        declared_value double precision NOT NULL,
+        insurance_cost double precision NOT NULL,
+        timestamp timestamp without time zone NOT NULL,
+        user_id integer
+    """,
+}
+
+
+def partition_table(table: str, columns: str) -> None:
+    old = f"{table}_unpartitioned"
+    op.execute(f"ALTER TABLE {table} RENAME TO {old}")
+    op.execute(f"ALTER TABLE {old} RENAME CONSTRAINT {table}_pkey TO {old}_pkey")
+    op.execute(f"ALTER INDEX ix_{table}_id RENAME TO ix_{old}_id")
+
+    # The partition key has to be part of the primary key; IDs stay unique
+    # through the shared sequence.
+    op.execute(
+        f"""
+        CREATE TABLE {table} (
+            {columns},
+            CONSTRAINT {table}_pkey PRIMARY KEY (id, timestamp)
+        ) PARTITION BY RANGE (timestamp)
+        """
+    )
+    op.execute(f"ALTER SEQUENCE {table}_id_seq OWNED BY {table}.id")
+    op.execute(f"CREATE INDEX ix_{table}_id ON {table} (id)")
+    op.execute(f"CREATE INDEX ix_{table}_timestamp ON {table} USING brin (timestamp)")
+    op.execute(f"CREATE TABLE {table}_default PARTITION OF {table} DEFAULT")
+    op.execute(
+        f"""
+        DO $$
+        DECLARE
+            month date := date_trunc(
+                'month', coalesce((SELECT min(timestamp) FROM {old}), now())
+            )::date;
+            last_month date := (
+                date_trunc('month', now()) + interval '{PREMAKE_MONTHS} months'
+            )::date;
+        BEGIN
+            WHILE month <= last_month LOOP
+                EXECUTE format(
+                    'CREATE TABLE %I PARTITION OF {table} FOR VALUES FROM (%L) TO (%L)',
+                    '{table}_' || to_char(month, '"y"YYYY"m"MM'),
+                    month,
+                    (month + interval '1 month')::date
+                );
+                month := (month + interval '1 month')::date;
+            END LOOP;
+        END $$
+        """
+    )
+    op.execute(f"INSERT INTO {table} SELECT * FROM {old}")
+    op.execute(f"DROP TABLE {old}")
+    op.execute(f"ANALYZE {table}")
+
+
+def unpartition_table(table: str, columns: str) -> None:
+    old = f"{table}_partitioned"
+    op.execute(f"ALTER TABLE {table} RENAME TO {old}")
+    op.execute(f"ALTER TABLE {old} RENAME CONSTRAINT {table}_pkey TO {old}_pkey")
+    op.execute(f"ALTER INDEX ix_{table}_id RENAME TO ix_{old}_id")
+
+    op.execute(
+        f"""
+        CREATE TABLE {table} (
+            {columns},
+            CONSTRAINT {table}_pkey PRIMARY KEY (id)
+        )
+        """
+    )
+    op.execute(f"ALTER SEQUENCE {table}_id_seq OWNED BY {table}.id")
+    op.execute(f"CREATE INDEX ix_{table}_id ON {table} (id)")
+    op.execute(f"INSERT INTO {table} SELECT * FROM {old}")
+    # Dropping the parent drops its attached partitions; detached ones stay.
+    op.execute(f"DROP TABLE {old}")
+
+
+def upgrade() -> None:
+    for table, columns in COLUMNS.items():
+        partition_table(table, columns)
+
+
+def downgrade() -> None:
+    for table, columns in COLUMNS.items():
+        unpartition_table(table, columns)
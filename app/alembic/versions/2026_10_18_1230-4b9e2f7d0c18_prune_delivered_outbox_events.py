@@ -0,0 +1,40 @@
+"""prune delivered outbox events and drop delivered_at
+
+Revision ID: 4b9e2f7d0c18
+Revises: 8d3f6a1c7e25
+Create Date: 2026-10-18 12:30:08.152946
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "4b9e2f7d0c18"
+down_revision: Union[str, None] = "8d3f6a1c7e25"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # The relay now deletes events once delivered; drop the ones it only marked
+    # and the column and index that told pending events apart.
+    op.execute("DELETE FROM outbox_events WHERE delivered_at IS NOT NULL")
+    op.drop_index("ix_outbox_events_undelivered", table_name="outbox_events")
+    op.drop_column("outbox_events", "delivered_at")
+
+
+def downgrade() -> None:
+    # Deleted events cannot be restored; every remaining one is pending.
+    op.add_column(
+        "outbox_events", sa.Column("delivered_at", sa.DateTime(), nullable=True)
+    )
+    op.create_index(
+        "ix_outbox_events_undelivered",
+        "outbox_events",
+        ["id"],
+        unique=False,
+        postgresql_where=sa.text("delivered_at IS NULL"),
+    )
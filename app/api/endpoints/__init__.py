@@ -1,7 +1,9 @@
 __all__ = (
     "tariffs_router",
     "insurance_router",
+    "system_router",
 )
 
 from .insurance import router as insurance_router
+from .system import router as system_router
 from .tariff import router as tariffs_router
@@ -1,9 +1,28 @@
-from fastapi import APIRouter, Depends
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, Header, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.responses import model_response
 from app.db.session import get_db
-from app.schemas.insurance import InsuranceCreate, InsuranceResponse
-from app.services.insurance import calculate_insurance_service
+from app.schemas.insurance import (
+    InsuranceBatchCreate,
+    InsuranceCreate,
+    InsuranceExportQuery,
+    InsuranceResponse,
+)
+from app.services.insurance import (
+    calculate_insurance_batch_service,
+    calculate_insurance_idempotent,
+    calculate_insurance_service,
+    export_insurance_requests,
+)
+
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
 
 router = APIRouter()
 
@@ -12,8 +31,43 @@ router = APIRouter()
 async def calculate_and_log_insurance(
     request: InsuranceCreate,
     db: AsyncSession = Depends(get_db),
+    idempotency_key: Annotated[str | None, Header(max_length=255)] = None,
 ):
     """
     Calculate insurance cost and log the request.
+
+    Retrying with the same `Idempotency-Key` header returns the original
+    response instead of recording the calculation again.
+    """
+    if idempotency_key is None:
+        return model_response(await calculate_insurance_service(request, db))
+    return model_response(
+        await calculate_insurance_idempotent(request, db, idempotency_key)
+    )
+
+
+@router.post("/batch", response_model=list[InsuranceResponse])
+async def calculate_and_log_insurance_batch(
+    request: InsuranceBatchCreate,
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Calculate insurance costs for a whole manifest and log the requests.
+    """
+    return model_response(await calculate_insurance_batch_service(request.items, db))
+
+
+@router.get("/export")
+async def export_insurance_history(query: Annotated[InsuranceExportQuery, Query()]):
+    """
+    Stream the history of insurance calculations as NDJSON or CSV.
     """
-    return await calculate_insurance_service(request, db)
+    return StreamingResponse(
+        export_insurance_requests(query),
+        media_type=EXPORT_MEDIA_TYPES[query.format],
+        headers={
+            "Content-Disposition": (
+                f'attachment; filename="insurance_requests.{query.format}"'
+            )
+        },
+    )
@@ -0,0 +1,13 @@
+from fastapi import APIRouter
+
+from app.db.database import db
+
+router = APIRouter()
+
+
+@router.get("/db-pool", response_model=dict)
+async def get_db_pool_status():
+    """
+    Report connection pool usage and checkout wait times.
+    """
+    return db.pool_status()
@@ -1,23 +1,33 @@
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from pydantic import TypeAdapter
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.cache import cached_response, tariff_response_cache
+from app.core.responses import model_response
 from app.db.repository.tariff import (
     create_tariff,
-    get_all_tariffs,
+    delete_tariff as remove_tariff,
     get_tariff_by_id,
+    list_tariffs_page,
     update_tariff,
 )
 from app.db.session import get_db
 from app.schemas.tariff import (
     TariffCreate,
+    TariffImportResponse,
     TariffJsonInput,
+    TariffListQuery,
     TariffResponse,
     TariffUpdatePartial,
 )
-from app.services.tariff import load_tariffs_from_json
+from app.services.tariff import import_tariffs_from_ndjson, load_tariffs_from_json
 
 router = APIRouter()
 
+tariff_list_adapter = TypeAdapter(list[TariffResponse])
+
 
 async def get_existing_tariff(tariff_id: int, db: AsyncSession):
     """
@@ -32,19 +42,49 @@ async def get_existing_tariff(tariff_id: int, db: AsyncSession):
 
 
 @router.get("/", response_model=list[TariffResponse])
-async def list_tariffs(db: AsyncSession = Depends(get_db)):
-    """
-    Retrieve all tariffs.
+async def list_tariffs(
+    request: Request,
+    query: Annotated[TariffListQuery, Query()],
+    db: AsyncSession = Depends(get_db),
+):
     """
-    return await get_all_tariffs(db)
+    Retrieve a page of tariffs ordered by ID.
+
+    When more tariffs match, the `X-Next-Cursor` header holds the `after_id`
+    value for the next page. Responses carry an `ETag`; send it back in
+    `If-None-Match` to get a 304 while the page is unchanged.
+    """
+    key = tariff_response_cache.key_for(request)
+    entry = tariff_response_cache.get(key)
+    if entry is None:
+        generation = tariff_response_cache.generation
+        tariffs = await list_tariffs_page(db, query, limit=query.limit + 1)
+        headers = {}
+        if len(tariffs) > query.limit:
+            tariffs = tariffs[: query.limit]
+            headers["X-Next-Cursor"] = str(tariffs[-1].id)
+        body = tariff_list_adapter.dump_json(
+            tariff_list_adapter.validate_python(tariffs, from_attributes=True)
+        )
+        entry = tariff_response_cache.put(key, body, generation, headers)
+    return cached_response(request, entry)
 
 
 @router.get("/{tariff_id}", response_model=TariffResponse)
-async def get_tariff(tariff_id: int, db: AsyncSession = Depends(get_db)):
+async def get_tariff(
+    request: Request, tariff_id: int, db: AsyncSession = Depends(get_db)
+):
     """
     Retrieve a tariff by its ID.
     """
-    return await get_existing_tariff(tariff_id, db)
+    key = tariff_response_cache.key_for(request)
+    entry = tariff_response_cache.get(key)
+    if entry is None:
+        generation = tariff_response_cache.generation
+        tariff = await get_existing_tariff(tariff_id, db)
+        body = TariffResponse.model_validate(tariff).model_dump_json().encode()
+        entry = tariff_response_cache.put(key, body, generation)
+    return cached_response(request, entry)
 
 
 @router.post("/", response_model=TariffResponse)
@@ -52,7 +92,9 @@ async def add_tariff(tariff_in: TariffCreate, db: AsyncSession = Depends(get_db)
     """
     Create a new tariff.
     """
-    return await create_tariff(db, tariff_in)
+    tariff = await create_tariff(db, tariff_in)
+    tariff_response_cache.clear()
+    return model_response(TariffResponse.model_validate(tariff))
 
 
 @router.put("/{tariff_id}", response_model=TariffResponse)
@@ -65,7 +107,9 @@ async def update_tariff_full(
     Fully update an existing tariff.
     """
     tariff = await get_existing_tariff(tariff_id, db)
-    return await update_tariff(db, tariff, tariff_update, partial=False)
+    tariff = await update_tariff(db, tariff, tariff_update, partial=False)
+    tariff_response_cache.clear()
+    return model_response(TariffResponse.model_validate(tariff))
 
 
 @router.patch("/{tariff_id}", response_model=TariffResponse)
@@ -78,7 +122,9 @@ async def update_tariff_partial(
     Partially update an existing tariff.
     """
     tariff = await get_existing_tariff(tariff_id, db)
-    return await update_tariff(db, tariff, tariff_update, partial=True)
+    tariff = await update_tariff(db, tariff, tariff_update, partial=True)
+    tariff_response_cache.clear()
+    return model_response(TariffResponse.model_validate(tariff))
 
 
 @router.delete("/{tariff_id}", response_model=dict)
@@ -90,8 +136,8 @@ async def delete_tariff(tariff_id: int, db: AsyncSession = Depends(get_db)):
     if not tariff:
         raise HTTPException(status_code=404, detail="Tariff not found")
 
-    await db.delete(tariff)
-    await db.commit()
+    await remove_tariff(db, tariff)
+    tariff_response_cache.clear()
     return {"status": "success", "message": f"Tariff with ID {tariff_id} deleted"}
 
 
@@ -108,6 +154,52 @@ async def load_tariffs(
             session=db,
             tariffs_data=tariffs_data.tariffs,
         )
+        tariff_response_cache.clear()
         return {"status": "success", "message": "Tariffs loaded successfully"}
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.post(
+    "/load-tariffs/stream",
+    response_model=TariffImportResponse,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/x-ndjson": {
+                    "schema": {"type": "string"},
+                    "example": (
+                        '{"valid_from": "2024-11-21", "cargo_type": "Glass", "rate": 0.04}\n'
+                        '{"valid_from": "2024-11-21", "cargo_type": "Other", "rate": 0.01}\n'
+                    ),
+                }
+            },
+        }
+    },
+)
+async def load_tariffs_stream(
+    request: Request,
+    chunk_size: int | None = Query(None, ge=1),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Stream tariffs into the database from an NDJSON body, one tariff per line.
+
+    Each chunk is validated and committed on its own; the response reports
+    the outcome of every chunk.
+    """
+    chunks = await import_tariffs_from_ndjson(
+        session=db,
+        stream=request.stream(),
+        chunk_size=chunk_size,
+    )
+    tariff_response_cache.clear()
+    failed = sum(chunk.status != "success" for chunk in chunks)
+    if not failed:
+        status = "success"
+    elif failed == len(chunks):
+        status = "error"
+    else:
+        status = "partial"
+    return TariffImportResponse(status=status, chunks=chunks)
@@ -1,8 +1,9 @@
 from fastapi import APIRouter
 
-from app.api.endpoints import insurance_router, tariffs_router
+from app.api.endpoints import insurance_router, system_router, tariffs_router
 
 router = APIRouter()
 
 router.include_router(tariffs_router, prefix="/tariffs", tags=["Tariffs"])
 router.include_router(insurance_router, prefix="/insurance", tags=["Insurance"])
+router.include_router(system_router, prefix="/system", tags=["System"])
@@ -0,0 +1,137 @@
+import hashlib
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+from fastapi import Request
+from starlette.responses import Response
+
+from app.core.config import settings
+from app.core.metrics import metrics
+
+
+@dataclass
+class CachedResponse:
+    """
+    A serialized response body together with its strong ETag.
+    """
+
+    body: bytes
+    etag: str
+    headers: dict = field(default_factory=dict)
+    media_type: str = "application/json"
+    expires_at: float = 0.0
+
+
+def make_etag(body: bytes) -> str:
+    return f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """
+    Evaluates an If-None-Match header, which uses the weak comparison.
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (tag.strip() for tag in if_none_match.split(","))
+    return etag in (tag.removeprefix("W/") for tag in candidates)
+
+
+class ResponseCache:
+    """
+    LRU cache of serialized responses whose entries expire after `ttl` seconds.
+
+    Every `clear` starts a new generation; entries computed by a request that
+    began before the clear are not stored, so a write racing with a read
+    cannot leave a stale response behind.
+    """
+
+    def __init__(self, max_entries: int, ttl: float, enabled: bool = True):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.enabled = enabled
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[str, CachedResponse] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def key_for(request: Request) -> str:
+        query = sorted(request.query_params.multi_items())
+        return f"{request.url.path}?{query}"
+
+    def get(self, key: str) -> CachedResponse | None:
+        entry = self._entries.get(key)
+        if entry is None or entry.expires_at <= time.monotonic():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(
+        self,
+        key: str,
+        body: bytes,
+        generation: int,
+        headers: dict | None = None,
+    ) -> CachedResponse:
+        """
+        Wraps a freshly serialized body and stores it unless the cache was
+        cleared since `generation` was read.
+        """
+        entry = CachedResponse(
+            body=body,
+            etag=make_etag(body),
+            headers=headers or {},
+            expires_at=time.monotonic() + self.ttl,
+        )
+        if self.enabled and generation == self.generation:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def clear(self):
+        self.generation += 1
+        self._entries.clear()
+
+
+def cached_response(request: Request, entry: CachedResponse) -> Response:
+    """
+    Builds the response for a cache entry, answering 304 when the client
+    already holds the same representation.
+    """
+    headers = {**entry.headers, "ETag": entry.etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), entry.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry.body, media_type=entry.media_type, headers=headers)
+
+
+tariff_response_cache = ResponseCache(
+    max_entries=settings.tariff_cache_max_entries,
+    ttl=settings.tariff_cache_ttl,
+    enabled=settings.tariff_cache_enabled,
+)
+metrics.gauge(
+    "tariff_cache_entries",
+    "Tariff responses currently cached.",
+    lambda: len(tariff_response_cache),
+)
+metrics.gauge(
+    "tariff_cache_hits", "Tariff response cache hits.", lambda: tariff_response_cache.hits
+)
+metrics.gauge(
+    "tariff_cache_misses",
+    "Tariff response cache misses.",
+    lambda: tariff_response_cache.misses,
+)
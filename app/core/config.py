@@ -1,3 +1,5 @@
+from typing import Literal
+
 from pydantic_settings import BaseSettings
 
 
@@ -9,6 +11,18 @@ class Settings(BaseSettings):
     project_name: str = "Insurance Service"
     version: str = "1.0.0"
     debug: bool = False
+    metrics_enabled: bool = True
+    fast_serialization: bool = False
+
+    server_host: str = "0.0.0.0"
+    server_port: int = 8000
+    server_workers: int = 1
+    server_loop: Literal["auto", "asyncio", "uvloop"] = "uvloop"
+    server_http: Literal["auto", "h11", "httptools"] = "httptools"
+    server_timeout_graceful_shutdown: int = 30
+    server_access_log: bool = False
+    warm_up_on_startup: bool = True
+    warm_up_timeout: float = 10.0
 
     postgres_user: str
     postgres_password: str
@@ -16,12 +30,69 @@ class Settings(BaseSettings):
     postgres_host: str
     postgres_port: int
     db_echo: bool = False
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 30
+    db_pool_recycle: int = -1
+    db_pool_pre_ping: bool = False
+    db_statement_cache_size: int = 100
+    sql_profiling_enabled: bool = False
+    sql_profile_slowest: int = 5
 
     kafka_broker: str = "kafka:9092"
     kafka_topic_tariffs: str = "tariff_logs"
     kafka_topic_insurance: str = "insurance_logs"
+    kafka_linger_ms: int = 5
+    kafka_compression_type: Literal["gzip", "snappy", "lz4", "zstd"] | None = None
+    kafka_max_batch_size: int = 16384
     batch_size: int = 5
     flush_interval: int = 30
+    log_queue_max_size: int = 10000
+    log_copy_threshold: int = 1000
+    log_delivery_mode: Literal["buffer", "outbox"] = "buffer"
+    outbox_relay_enabled: bool = True
+    outbox_relay_batch_size: int = 1000
+    outbox_relay_interval: float = 1.0
+    log_queue_overflow_policy: Literal["block", "drop_newest", "drop_oldest"] = "block"
+    log_spill_enabled: bool = True
+    log_spill_dir: str = "var/log-spill"
+    log_spill_segment_max_bytes: int = 64 * 1024 * 1024
+    log_spill_replay_batch_size: int = 1000
+
+    partition_maintenance_enabled: bool = True
+    partition_maintenance_interval: float = 6 * 3600.0
+    partition_premake_months: int = 3
+    partition_retention_mode: Literal["detach", "drop"] = "detach"
+    action_logs_retention_months: int | None = None
+    insurance_requests_retention_months: int | None = None
+
+    insurance_batch_max_size: int = 1000
+    idempotency_cache_max_entries: int = 10000
+    idempotency_cache_ttl: float = 3600.0
+    idempotency_key_ttl: float = 7 * 24 * 3600.0
+    idempotency_purge_enabled: bool = True
+    idempotency_purge_interval: float = 3600.0
+    idempotency_purge_batch_size: int = 10000
+    export_chunk_size: int = 1000
+    repricing_chunk_size: int = 5000
+    repricing_partitions: int = 16
+    repricing_workers: int = 4
+    repricing_progress_interval: float = 10.0
+
+    tariff_import_chunk_size: int = 500
+
+    tariff_index_enabled: bool = True
+    tariff_index_check_interval: float = 1.0
+    tariff_listener_enabled: bool = True
+    tariff_listener_channel: str = "tariff_changes"
+    tariff_listener_retry_interval: float = 5.0
+    tariff_timeline_enabled: bool = True
+    tariff_timeline_past_days: int = 730
+    tariff_timeline_future_days: int = 730
+
+    tariff_cache_enabled: bool = True
+    tariff_cache_max_entries: int = 1024
+    tariff_cache_ttl: float = 60.0
 
     @property
     def db_url(self) -> str:
@@ -34,6 +105,13 @@ class Settings(BaseSettings):
             f"{self.postgres_port}/{self.postgres_db}"
         )
 
+    @property
+    def db_dsn(self) -> str:
+        """
+        Database URL for connecting with asyncpg directly.
+        """
+        return self.db_url.replace("postgresql+asyncpg://", "postgresql://", 1)
+
     class Config:
         env_file = ".env"
 
@@ -1,21 +1,46 @@
+import asyncio
 import json
 import logging
+import time
 from typing import Optional
 
 from aiokafka import AIOKafkaProducer
 
 from app.core.config import settings
+from app.core.metrics import metrics
 
 logger = logging.getLogger("kafka")
 
 producer: Optional[AIOKafkaProducer] = None
 
+KAFKA_SEND_DURATION = metrics.histogram(
+    "kafka_send_duration_seconds",
+    "Time until Kafka acknowledged a single message or a whole batch.",
+    ("mode",),
+)
+
 
 async def get_kafka_producer() -> AIOKafkaProducer:
     global producer
     if producer is None:
-        producer = AIOKafkaProducer(bootstrap_servers=settings.kafka_broker)
-        await producer.start()
+        new_producer = AIOKafkaProducer(
+            bootstrap_servers=settings.kafka_broker,
+            linger_ms=settings.kafka_linger_ms,
+            compression_type=settings.kafka_compression_type,
+            max_batch_size=settings.kafka_max_batch_size,
+        )
+        # Only publish the producer once it has connected, so a failed start
+        # is retried by the next caller instead of leaving a dead producer.
+        # A start cancelled by a timeout (e.g. the warm-up's wait_for) raises
+        # CancelledError, which must release the producer as well.
+        started = False
+        try:
+            await new_producer.start()
+            started = True
+        finally:
+            if not started:
+                await asyncio.shield(new_producer.stop())
+        producer = new_producer
         logger.info("Kafka producer started.")
     return producer
 
@@ -31,7 +56,9 @@ async def produce_message(topic: str, message: dict, user_id: Optional[int] = No
         serialized_message = json.dumps(message).encode("utf-8")
         producer_instance = await get_kafka_producer()
 
+        start = time.perf_counter()
         await producer_instance.send_and_wait(topic, serialized_message)
+        KAFKA_SEND_DURATION.labels("single").observe(time.perf_counter() - start)
         logger.info(f"Message sent to Kafka topic '{topic}': {message}")
 
     except Exception as e:
@@ -39,6 +66,33 @@ async def produce_message(topic: str, message: dict, user_id: Optional[int] = No
         raise
 
 
+async def produce_messages(messages: list[tuple[str, dict]]) -> None:
+    """
+    Sends a batch of (topic, message) pairs to Kafka.
+
+    All messages are handed to the producer's accumulator first and the
+    delivery futures are awaited together, so the batch costs a few broker
+    round trips instead of one per message.
+    """
+    if not messages:
+        return
+
+    try:
+        producer_instance = await get_kafka_producer()
+        start = time.perf_counter()
+        futures = [
+            await producer_instance.send(topic, json.dumps(message).encode("utf-8"))
+            for topic, message in messages
+        ]
+        await asyncio.gather(*futures)
+        KAFKA_SEND_DURATION.labels("batch").observe(time.perf_counter() - start)
+        logger.info(f"Sent {len(messages)} messages to Kafka.")
+
+    except Exception as e:
+        logger.error(f"Failed to send {len(messages)} messages to Kafka: {e}")
+        raise
+
+
 async def shutdown_kafka_producer():
     global producer
     if producer:
@@ -0,0 +1,236 @@
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import wraps
+from typing import Callable, Iterator, Sequence
+
+DEFAULT_LATENCY_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram with Prometheus `le` (less than or equal) semantics.
+    """
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative_counts(self) -> list[tuple[str, int]]:
+        total = 0
+        result = []
+        for bound, count in zip((*self.buckets, float("inf")), self.counts):
+            total += count
+            result.append(("+Inf" if bound == float("inf") else str(bound), total))
+        return result
+
+    def snapshot(self) -> dict:
+        return {
+            "buckets": dict(self.cumulative_counts()),
+            "sum": self.sum,
+            "count": self.count,
+        }
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(str(value))}"' for name, value in labels.items())
+    return f"{{{pairs}}}"
+
+
+def _render_histogram(name: str, labels: dict, histogram: Histogram) -> list[str]:
+    lines = [
+        f"{name}_bucket{_format_labels({**labels, 'le': bound})} {count}"
+        for bound, count in histogram.cumulative_counts()
+    ]
+    lines.append(f"{name}_sum{_format_labels(labels)} {histogram.sum}")
+    lines.append(f"{name}_count{_format_labels(labels)} {histogram.count}")
+    return lines
+
+
+class HistogramFamily:
+    """
+    Set of histograms sharing a name, split by label values.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.bucket_bounds = tuple(buckets)
+        self._children: dict[tuple, Histogram] = {}
+
+    def labels(self, *values) -> Histogram:
+        child = self._children.get(values)
+        if child is None:
+            child = self._children[values] = Histogram(self.bucket_bounds)
+        return child
+
+    def observe(self, value: float) -> None:
+        self.labels().observe(value)
+
+    def render(self) -> list[str]:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} histogram",
+        ]
+        for values, histogram in self._children.items():
+            lines.extend(
+                _render_histogram(
+                    self.name, dict(zip(self.labelnames, values)), histogram
+                )
+            )
+        return lines
+
+
+class CallbackGauge:
+    """
+    Gauge whose value is read from a callback at scrape time.
+    """
+
+    def __init__(self, name: str, documentation: str, callback: Callable[[], float]):
+        self.name = name
+        self.documentation = documentation
+        self.callback = callback
+
+    def render(self) -> list[str]:
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} gauge",
+            f"{self.name} {self.callback()}",
+        ]
+
+
+class CallbackHistogram:
+    """
+    Histogram owned by another component and read at scrape time.
+    """
+
+    def __init__(
+        self, name: str, documentation: str, callback: Callable[[], Histogram]
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.callback = callback
+
+    def render(self) -> list[str]:
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} histogram",
+            *_render_histogram(self.name, {}, self.callback()),
+        ]
+
+
+class MetricsRegistry:
+    """
+    Collection of metrics rendered in the Prometheus text exposition format.
+
+    Recording is a bisect and two additions on the request path; gauges and
+    callback histograms cost nothing until `render` is called by a scrape.
+    """
+
+    def __init__(self):
+        self._collectors: dict[str, object] = {}
+
+    def register(self, collector):
+        self._collectors[collector.name] = collector
+        return collector
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS,
+    ) -> HistogramFamily:
+        return self.register(HistogramFamily(name, documentation, labelnames, buckets))
+
+    def gauge(
+        self, name: str, documentation: str, callback: Callable[[], float]
+    ) -> CallbackGauge:
+        return self.register(CallbackGauge(name, documentation, callback))
+
+    def histogram_callback(
+        self, name: str, documentation: str, callback: Callable[[], Histogram]
+    ) -> CallbackHistogram:
+        return self.register(CallbackHistogram(name, documentation, callback))
+
+    def render(self) -> str:
+        lines = []
+        for collector in self._collectors.values():
+            lines.extend(collector.render())
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+
+REQUEST_DURATION = metrics.histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by method, route and status code.",
+    ("method", "route", "status"),
+)
+STAGE_DURATION = metrics.histogram(
+    "app_stage_duration_seconds",
+    "Duration of internal processing stages.",
+    ("stage",),
+)
+
+
+@contextmanager
+def stage_timer(stage: str) -> Iterator[None]:
+    """
+    Record the duration of the enclosed block under `stage`.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_DURATION.labels(stage).observe(time.perf_counter() - start)
+
+
+def timed_stage(stage: str):
+    """
+    Decorator recording the duration of an async function under `stage`.
+    """
+
+    def decorator(func):
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            with stage_timer(stage):
+                return await func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,90 @@
+import time
+from urllib.parse import parse_qs
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.metrics import REQUEST_DURATION
+from app.db.profiler import SQLProfile, current_sql_profile
+
+PROFILE_HEADER = "x-sql-profile"
+PROFILE_QUERY_PARAM = "sql_profile"
+PROFILE_ON_VALUES = {"1", "true", "yes", "on"}
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording request latency per route template.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # FastAPI stores the matched route in the scope while routing.
+            route = scope.get("route")
+            REQUEST_DURATION.labels(
+                scope["method"],
+                route.path if route else "unmatched",
+                str(status_code),
+            ).observe(time.perf_counter() - start)
+
+
+class SQLProfilerMiddleware:
+    """
+    ASGI middleware profiling the SQL of requests that ask for it.
+
+    A request opts in with the `X-SQL-Profile: 1` header or `?sql_profile=1`.
+    Its response then carries the statement count and total database time
+    in `Server-Timing`, and the slowest statements as JSON in `X-SQL-Profile`.
+    """
+
+    def __init__(self, app: ASGIApp, slowest_limit: int = 5):
+        self.app = app
+        self.slowest_limit = slowest_limit
+
+    @staticmethod
+    def _wants_profile(scope: Scope) -> bool:
+        for name, value in scope["headers"]:
+            if name == PROFILE_HEADER.encode():
+                return value.decode().lower() in PROFILE_ON_VALUES
+        values = parse_qs(scope.get("query_string", b"").decode()).get(
+            PROFILE_QUERY_PARAM, []
+        )
+        return any(value.lower() in PROFILE_ON_VALUES for value in values)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or not self._wants_profile(scope):
+            await self.app(scope, receive, send)
+            return
+
+        profile = SQLProfile(self.slowest_limit)
+        token = current_sql_profile.set(profile)
+
+        async def send_wrapper(message: Message):
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", profile.server_timing())
+                headers.append("X-SQL-Profile", profile.summary())
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current_sql_profile.reset(token)
@@ -0,0 +1,23 @@
+from typing import Any
+
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel
+
+from app.core.config import settings
+
+
+def model_response(content: BaseModel | list[BaseModel]) -> Any:
+    """
+    Wrap already validated response models for the fast serialization path.
+
+    With `FAST_SERIALIZATION` enabled the models are dumped once and rendered
+    by orjson. Returning a Response makes FastAPI skip its second validation
+    pass against `response_model` and the stdlib JSON encoder. Otherwise the
+    content is returned unchanged and goes through FastAPI's usual path.
+    """
+    if not settings.fast_serialization:
+        return content
+
+    if isinstance(content, list):
+        return ORJSONResponse([model.model_dump() for model in content])
+    return ORJSONResponse(content.model_dump())
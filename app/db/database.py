@@ -1,5 +1,7 @@
+import asyncio
 from asyncio import current_task
 
+from sqlalchemy import text
 from sqlalchemy.ext.asyncio import (
     async_scoped_session,
     async_sessionmaker,
@@ -7,10 +9,22 @@ from sqlalchemy.ext.asyncio import (
 )
 
 from app.core.config import settings
+from app.core.metrics import metrics
+from app.db.pool import InstrumentedAsyncPool
 
 
 class Database:
-    def __init__(self, db_url: str, echo: bool = False):
+    def __init__(
+        self,
+        db_url: str,
+        echo: bool = False,
+        pool_size: int = 5,
+        max_overflow: int = 10,
+        pool_timeout: float = 30,
+        pool_recycle: int = -1,
+        pool_pre_ping: bool = False,
+        statement_cache_size: int = 100,
+    ):
         """
         Database helper class for managing async SQLAlchemy sessions.
         """
@@ -18,6 +32,16 @@ class Database:
             db_url,
             future=True,
             echo=echo,
+            poolclass=InstrumentedAsyncPool,
+            pool_size=pool_size,
+            max_overflow=max_overflow,
+            pool_timeout=pool_timeout,
+            pool_recycle=pool_recycle,
+            pool_pre_ping=pool_pre_ping,
+            connect_args={
+                "statement_cache_size": statement_cache_size,
+                "prepared_statement_cache_size": statement_cache_size,
+            },
         )
         self.session_factory = async_sessionmaker(
             bind=self.engine,
@@ -30,6 +54,40 @@ class Database:
             scopefunc=current_task,
         )
 
+    def pool_status(self) -> dict:
+        """
+        Current usage of the connection pool plus checkout counters.
+        """
+        pool = self.engine.pool
+        metrics = pool.metrics
+        return {
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            "overflow": max(pool.overflow(), 0),
+            "max_overflow": pool._max_overflow,
+            "checkouts_total": metrics.checkouts,
+            "overflow_created_total": metrics.overflow_created,
+            "timeouts_total": metrics.timeouts,
+            "wait_seconds": metrics.wait_seconds.snapshot(),
+        }
+
+    async def warm_up(self, connections: int | None = None) -> None:
+        """
+        Open pooled connections ahead of the first requests.
+
+        The pings run concurrently, so each one checks out its own connection
+        and the pool ends up holding `connections` (by default, the pool size).
+        """
+
+        async def ping():
+            async with self.engine.connect() as connection:
+                await connection.execute(text("SELECT 1"))
+
+        await asyncio.gather(
+            *(ping() for _ in range(connections or self.engine.pool.size()))
+        )
+
     async def get_session(self):
         """
         Dependency для FastAPI for creating async sessions.
@@ -42,4 +100,23 @@ class Database:
 db = Database(
     db_url=settings.db_url,
     echo=settings.db_echo,
+    pool_size=settings.db_pool_size,
+    max_overflow=settings.db_max_overflow,
+    pool_timeout=settings.db_pool_timeout,
+    pool_recycle=settings.db_pool_recycle,
+    pool_pre_ping=settings.db_pool_pre_ping,
+    statement_cache_size=settings.db_statement_cache_size,
+)
+
+for name, key, documentation in (
+    ("db_pool_checked_out", "checked_out", "Connections currently checked out."),
+    ("db_pool_overflow", "overflow", "Overflow connections currently open."),
+    ("db_pool_checkouts", "checkouts_total", "Connection checkouts since start."),
+    ("db_pool_timeouts", "timeouts_total", "Checkouts that timed out waiting."),
+):
+    metrics.gauge(name, documentation, lambda key=key: db.pool_status()[key])
+metrics.histogram_callback(
+    "db_pool_checkout_wait_seconds",
+    "Time spent waiting for a pooled connection.",
+    lambda: db.engine.pool.metrics.wait_seconds,
 )
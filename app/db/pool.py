@@ -0,0 +1,49 @@
+import time
+
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from app.core.metrics import Histogram
+
+
+class PoolMetrics:
+    """
+    Counters collected by `InstrumentedAsyncPool` on every checkout.
+    """
+
+    def __init__(self):
+        self.checkouts = 0
+        self.overflow_created = 0
+        self.timeouts = 0
+        self.wait_seconds = Histogram()
+
+
+class InstrumentedAsyncPool(AsyncAdaptedQueuePool):
+    """
+    Async queue pool that records how long each checkout waited for a connection.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+
+    def _do_get(self):
+        overflow_before = self._overflow
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            self.metrics.timeouts += 1
+            raise
+        finally:
+            self.metrics.wait_seconds.observe(time.perf_counter() - start)
+
+        self.metrics.checkouts += 1
+        if self._overflow > max(overflow_before, 0):
+            self.metrics.overflow_created += 1
+        return connection
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
@@ -0,0 +1,99 @@
+import heapq
+import json
+import time
+from contextvars import ContextVar
+from itertools import count
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+STATEMENT_PREVIEW_LENGTH = 300
+_QUERY_START_KEY = "sql_profile_query_start"
+
+
+class SQLProfile:
+    """
+    Statements executed while serving one profiled request.
+    """
+
+    def __init__(self, slowest_limit: int):
+        self.slowest_limit = slowest_limit
+        self.statements = 0
+        self.total_seconds = 0.0
+        self._slowest: list[tuple[float, int, str]] = []
+        self._order = count()
+
+    def record(self, statement: str, duration: float):
+        self.statements += 1
+        self.total_seconds += duration
+        entry = (duration, next(self._order), statement)
+        if len(self._slowest) < self.slowest_limit:
+            heapq.heappush(self._slowest, entry)
+        elif duration > self._slowest[0][0]:
+            heapq.heapreplace(self._slowest, entry)
+
+    def slowest(self) -> list[dict]:
+        return [
+            {
+                "ms": round(duration * 1000, 3),
+                "sql": " ".join(statement.split())[:STATEMENT_PREVIEW_LENGTH],
+            }
+            for duration, _, statement in sorted(self._slowest, reverse=True)
+        ]
+
+    def server_timing(self) -> str:
+        return (
+            f'db;dur={self.total_seconds * 1000:.3f};desc="{self.statements} statements"'
+        )
+
+    def summary(self) -> str:
+        return json.dumps(
+            {
+                "statements": self.statements,
+                "total_ms": round(self.total_seconds * 1000, 3),
+                "slowest": self.slowest(),
+            },
+            separators=(",", ":"),
+        )
+
+
+current_sql_profile: ContextVar[SQLProfile | None] = ContextVar(
+    "current_sql_profile", default=None
+)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if current_sql_profile.get() is not None:
+        conn.info.setdefault(_QUERY_START_KEY, []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = current_sql_profile.get()
+    starts = conn.info.get(_QUERY_START_KEY)
+    if profile is not None and starts:
+        profile.record(statement, time.perf_counter() - starts.pop())
+
+
+def _handle_error(exception_context):
+    # A failed statement never reaches after_cursor_execute.
+    conn = exception_context.connection
+    starts = conn.info.get(_QUERY_START_KEY) if conn is not None else None
+    if starts:
+        starts.pop()
+
+
+def install_sql_profiler(engine: AsyncEngine):
+    """
+    Hook statement timing into the engine.
+
+    The listeners only do work for requests that opted into profiling; they
+    are not installed at all unless SQL profiling is enabled in the settings.
+    Installing them twice is a no-op.
+    """
+    if event.contains(
+        engine.sync_engine, "before_cursor_execute", _before_cursor_execute
+    ):
+        return
+    event.listen(engine.sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine.sync_engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine.sync_engine, "handle_error", _handle_error)
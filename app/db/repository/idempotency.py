@@ -0,0 +1,47 @@
+from datetime import datetime
+
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.insurance import IdempotencyKey
+
+
+async def get_idempotency_key(session: AsyncSession, key: str) -> IdempotencyKey | None:
+    """
+    Retrieve the stored response for an idempotency key.
+    """
+    return await session.get(IdempotencyKey, key)
+
+
+def add_idempotency_key(
+    session: AsyncSession, key: str, request_hash: str, response: dict
+) -> IdempotencyKey:
+    """
+    Store the response for an idempotency key in the session's transaction.
+
+    A concurrent request that committed the same key first makes the commit
+    fail with an IntegrityError on the primary key.
+    """
+    record = IdempotencyKey(key=key, request_hash=request_hash, response=response)
+    session.add(record)
+    return record
+
+
+async def delete_idempotency_keys_before(
+    session: AsyncSession, cutoff: datetime, limit: int
+) -> int:
+    """
+    Delete up to `limit` of the oldest keys created before `cutoff`.
+    """
+    expired = (
+        select(IdempotencyKey.key)
+        .where(IdempotencyKey.created_at < cutoff)
+        .order_by(IdempotencyKey.created_at)
+        .limit(limit)
+    )
+    result = await session.execute(
+        delete(IdempotencyKey)
+        .where(IdempotencyKey.key.in_(expired.scalar_subquery()))
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount
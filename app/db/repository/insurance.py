@@ -1,8 +1,32 @@
-from sqlalchemy import select
+from datetime import datetime, time, timedelta
+from typing import AsyncIterator, Sequence
+
+from sqlalchemy import (
+    DateTime,
+    Float,
+    Integer,
+    Row,
+    column,
+    func,
+    insert,
+    select,
+    update,
+    values,
+)
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.insurance import InsuranceRequest
-from app.schemas.insurance import InsuranceCreate
+from app.models.tariff import CargoType
+from app.schemas.insurance import InsuranceCreate, InsuranceExportQuery
+
+EXPORT_COLUMNS = (
+    "id",
+    "cargo_type",
+    "declared_value",
+    "insurance_cost",
+    "timestamp",
+    "user_id",
+)
 
 
 async def create_insurance_request(
@@ -21,9 +45,163 @@ async def create_insurance_request(
     return insurance_request
 
 
+async def create_insurance_requests(
+    session: AsyncSession,
+    insurance_data: list[InsuranceCreate],
+    insurance_costs: list[float],
+) -> list[InsuranceRequest]:
+    """
+    Insert a batch of insurance calculation requests with a single INSERT ... RETURNING.
+
+    The returned requests are in the order of `insurance_data`.
+    """
+    timestamp = datetime.utcnow()
+    rows = [
+        {
+            "cargo_type": item.cargo_type,
+            "declared_value": item.declared_value,
+            "insurance_cost": cost,
+            "timestamp": timestamp,
+            "user_id": item.user_id,
+        }
+        for item, cost in zip(insurance_data, insurance_costs)
+    ]
+    # Postgres does not promise RETURNING rows in VALUES order; the ordered
+    # insertmanyvalues form tags each row with a counter and sorts by it.
+    result = await session.scalars(
+        insert(InsuranceRequest).returning(
+            InsuranceRequest, sort_by_parameter_order=True
+        ),
+        rows,
+    )
+    return list(result.all())
+
+
 async def get_insurance_requests(session: AsyncSession) -> list[InsuranceRequest]:
     """
     Retrieve all insurance calculation requests from the database.
     """
     result = await session.execute(select(InsuranceRequest))
     return list(result.scalars().all())
+
+
+async def stream_insurance_requests(
+    session: AsyncSession, query: InsuranceExportQuery, chunk_size: int
+) -> AsyncIterator[Sequence[Row]]:
+    """
+    Stream insurance requests matching `query` from a server-side cursor.
+
+    Rows are plain column tuples ordered by ID and yielded in chunks of
+    `chunk_size`, so memory use does not depend on the size of the export.
+    """
+    stmt = select(
+        *(getattr(InsuranceRequest, column) for column in EXPORT_COLUMNS)
+    )
+    if query.date_from is not None:
+        stmt = stmt.where(
+            InsuranceRequest.timestamp >= datetime.combine(query.date_from, time.min)
+        )
+    if query.date_to is not None:
+        stmt = stmt.where(
+            InsuranceRequest.timestamp
+            < datetime.combine(query.date_to + timedelta(days=1), time.min)
+        )
+    if query.cargo_type is not None:
+        stmt = stmt.where(InsuranceRequest.cargo_type == query.cargo_type)
+    if query.user_id is not None:
+        stmt = stmt.where(InsuranceRequest.user_id == query.user_id)
+
+    stmt = stmt.order_by(InsuranceRequest.id).execution_options(yield_per=chunk_size)
+    result = await session.stream(stmt)
+    async for rows in result.partitions():
+        yield rows
+
+
+def _repricing_filters(
+    since: datetime | None, until: datetime | None, cargo_type: CargoType | None
+) -> list:
+    filters = []
+    if since is not None:
+        filters.append(InsuranceRequest.timestamp >= since)
+    if until is not None:
+        filters.append(InsuranceRequest.timestamp < until)
+    if cargo_type is not None:
+        filters.append(InsuranceRequest.cargo_type == cargo_type)
+    return filters
+
+
+async def get_insurance_id_bounds(
+    session: AsyncSession,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    cargo_type: CargoType | None = None,
+) -> tuple[int | None, int | None]:
+    """
+    Smallest and largest ID of the insurance requests matching the filters.
+    """
+    result = await session.execute(
+        select(func.min(InsuranceRequest.id), func.max(InsuranceRequest.id)).where(
+            *_repricing_filters(since, until, cargo_type)
+        )
+    )
+    return tuple(result.one())
+
+
+async def get_insurance_requests_chunk(
+    session: AsyncSession,
+    after_id: int,
+    last_id: int,
+    limit: int,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    cargo_type: CargoType | None = None,
+) -> Sequence[Row]:
+    """
+    Next chunk of pricing columns with `after_id < id <= last_id`, ordered by ID.
+    """
+    result = await session.execute(
+        select(
+            InsuranceRequest.id,
+            InsuranceRequest.cargo_type,
+            InsuranceRequest.declared_value,
+            InsuranceRequest.insurance_cost,
+            InsuranceRequest.timestamp,
+        )
+        .where(
+            InsuranceRequest.id > after_id,
+            InsuranceRequest.id <= last_id,
+            *_repricing_filters(since, until, cargo_type),
+        )
+        .order_by(InsuranceRequest.id)
+        .limit(limit)
+    )
+    return result.all()
+
+
+async def update_insurance_costs(
+    session: AsyncSession, costs: list[tuple[int, datetime, float]]
+) -> None:
+    """
+    Write `(id, timestamp, insurance_cost)` rows with one UPDATE ... FROM VALUES.
+
+    The timestamp is matched along with the ID so the statement only touches
+    the partitions the rows live in.
+    """
+    if not costs:
+        return
+
+    repriced = values(
+        column("id", Integer),
+        column("timestamp", DateTime),
+        column("insurance_cost", Float),
+        name="repriced",
+    ).data(costs)
+    await session.execute(
+        update(InsuranceRequest)
+        .where(
+            InsuranceRequest.id == repriced.c.id,
+            InsuranceRequest.timestamp == repriced.c.timestamp,
+        )
+        .values(insurance_cost=repriced.c.insurance_cost)
+        .execution_options(synchronize_session=False)
+    )
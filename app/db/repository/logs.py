@@ -1,18 +1,63 @@
+import json
+from datetime import datetime
+
+from sqlalchemy import insert, text
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.config import settings
 from app.models.logs import ActionLog
 
+ACTION_LOG_COLUMNS = ("action", "payload", "timestamp", "user_id")
+
+
+def action_log_entry(message: dict) -> dict:
+    """
+    Map a log message as sent to Kafka to an `action_logs` row.
+    """
+    return {
+        "action": message["action"],
+        "payload": message["details"],
+        "timestamp": datetime.fromisoformat(message["timestamp"]),
+        "user_id": message["user_id"],
+    }
+
+
+async def save_action_logs(session: AsyncSession, entries: list[dict]) -> None:
+    """
+    Bulk insert action logs without going through the ORM unit of work.
+
+    Each entry holds the `action`, `payload`, `timestamp` and `user_id`
+    columns. Batches of at least `log_copy_threshold` rows are written with
+    asyncpg COPY, smaller ones with a Core executemany INSERT.
+    """
+    if not entries:
+        return
+
+    if len(entries) >= settings.log_copy_threshold:
+        await copy_action_logs(session, entries)
+    else:
+        await session.execute(insert(ActionLog.__table__), entries)
+
 
-async def save_action_log(
-    session: AsyncSession, action: str, payload: dict, user_id: int | None = None
-) -> ActionLog:
+async def copy_action_logs(session: AsyncSession, entries: list[dict]) -> None:
     """
-    Save an action log to the database.
+    Write action logs with COPY on the session's connection and transaction.
     """
-    log_entry = ActionLog(
-        action=action,
-        payload=payload,
-        user_id=user_id,
+    connection = await session.connection()
+    # The asyncpg dialect only sends BEGIN with the first statement it runs;
+    # a COPY on the driver connection before that would autocommit.
+    await connection.execute(text("SELECT 1"))
+    raw_connection = await connection.get_raw_connection()
+    await raw_connection.driver_connection.copy_records_to_table(
+        ActionLog.__tablename__,
+        columns=ACTION_LOG_COLUMNS,
+        records=[
+            (
+                entry["action"],
+                json.dumps(entry["payload"]),
+                entry["timestamp"],
+                entry["user_id"],
+            )
+            for entry in entries
+        ],
     )
-    session.add(log_entry)
-    return log_entry
@@ -1,21 +1,54 @@
-from sqlalchemy import select
+from datetime import date
+
+from fastapi import HTTPException
+from sqlalchemy import desc, select, union_all
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
-
-from app.models.tariff import Tariff
-from app.schemas.tariff import TariffCreate, TariffUpdate
-from app.services.tariff import validate_tariff_dates
-
-
-async def get_all_tariffs(session: AsyncSession) -> list[Tariff]:
+from sqlalchemy.orm import aliased
+
+from app.core.metrics import timed_stage
+from app.models.tariff import CargoType, Tariff
+from app.schemas.tariff import TariffCreate, TariffListQuery, TariffUpdate
+from app.services.kafka import commit_and_log, discard_pending_logs
+from app.services.tariff import is_overlap_violation, overlap_violation_error
+from app.services.tariff_index import (
+    CargoTariffIntervals,
+    bump_tariff_version,
+    tariff_index,
+)
+
+
+@timed_stage("tariff_repository.list_tariffs_page")
+async def list_tariffs_page(
+    session: AsyncSession, query: TariffListQuery, limit: int | None = None
+) -> list[Tariff]:
     """
-    Retrieve all tariffs from the database.
+    Retrieve one page of tariffs ordered by ID, starting after `query.after_id`.
     """
-    stmt = select(Tariff).order_by(Tariff.id)
+    stmt = select(Tariff)
+    if query.after_id is not None:
+        stmt = stmt.where(Tariff.id > query.after_id)
+    if query.cargo_type is not None:
+        stmt = stmt.where(Tariff.cargo_type == query.cargo_type)
+    if query.active_on is not None:
+        stmt = stmt.where(
+            Tariff.valid_from <= query.active_on, Tariff.valid_to >= query.active_on
+        )
+    if query.valid_from_gte is not None:
+        stmt = stmt.where(Tariff.valid_from >= query.valid_from_gte)
+    if query.valid_from_lte is not None:
+        stmt = stmt.where(Tariff.valid_from <= query.valid_from_lte)
+    if query.valid_to_gte is not None:
+        stmt = stmt.where(Tariff.valid_to >= query.valid_to_gte)
+    if query.valid_to_lte is not None:
+        stmt = stmt.where(Tariff.valid_to <= query.valid_to_lte)
+
+    stmt = stmt.order_by(Tariff.id).limit(limit or query.limit)
     result = await session.execute(stmt)
     return list(result.scalars().all())
 
 
+@timed_stage("tariff_repository.get_tariff_by_id")
 async def get_tariff_by_id(session: AsyncSession, tariff_id: int) -> Tariff | None:
     """
     Retrieve a tariff by its ID.
@@ -23,19 +56,52 @@ async def get_tariff_by_id(session: AsyncSession, tariff_id: int) -> Tariff | No
     return await session.get(Tariff, tariff_id)
 
 
+@timed_stage("tariff_repository.resolve_tariff")
+async def resolve_tariff(
+    session: AsyncSession, cargo_type: CargoType, calc_date: date
+) -> Tariff | None:
+    """
+    Retrieve the tariff valid on `calc_date`, or the nearest one, in one query.
+
+    The query is a UNION ALL of three LIMIT 1 branches, each walking the
+    (cargo_type, valid_from, valid_to) index: the current tariff, the nearest
+    past one and the nearest future one. Periods of a cargo type cannot
+    overlap, so only the latest tariff starting on or before `calc_date` can
+    be current, and the past branch skips at most that one row. The winner
+    among the (at most three) rows is picked like the tariff index does.
+    """
+    base = select(Tariff).where(Tariff.cargo_type == cargo_type)
+    latest = aliased(
+        Tariff,
+        base.where(Tariff.valid_from <= calc_date)
+        .order_by(desc(Tariff.valid_from))
+        .limit(1)
+        .subquery(),
+    )
+    current = select(latest).where(latest.valid_to >= calc_date)
+    past = (
+        base.where(Tariff.valid_from < calc_date, Tariff.valid_to < calc_date)
+        .order_by(desc(Tariff.valid_from))
+        .limit(1)
+    )
+    future = (
+        base.where(Tariff.valid_from > calc_date).order_by(Tariff.valid_from).limit(1)
+    )
+
+    stmt = select(Tariff).from_statement(union_all(current, past, future))
+    result = await session.execute(stmt)
+    return CargoTariffIntervals(list(result.scalars())).resolve(calc_date)
+
+
+@timed_stage("tariff_repository.create_tariff")
 async def create_tariff(
     session: AsyncSession, tariff_in: TariffCreate, user_id: int | None = None
 ) -> Tariff:
     """
     Create a new tariff and log the action to Kafka.
-    """
-    await validate_tariff_dates(
-        session=session,
-        cargo_type=tariff_in.cargo_type,
-        valid_from=tariff_in.valid_from,
-        valid_to=tariff_in.valid_to,
-    )
 
+    Overlapping periods are rejected by the database's exclusion constraint.
+    """
     tariff = Tariff(
         cargo_type=tariff_in.cargo_type,
         rate=tariff_in.rate,
@@ -45,16 +111,24 @@ async def create_tariff(
 
     session.add(tariff)
     try:
-        await session.commit()
-        await session.refresh(tariff)
-        await tariff.log_creation()
+        await session.flush()
+        await tariff.log_creation(session)
+        version = await bump_tariff_version(session, upserts=[tariff])
+        await commit_and_log(session)
+        tariff_index.apply_change(version, upsert=tariff)
     except IntegrityError as e:
         await session.rollback()
+        if is_overlap_violation(e):
+            raise await overlap_violation_error(
+                session,
+                [(tariff_in.cargo_type, tariff_in.valid_from, tariff_in.valid_to)],
+            )
         raise ValueError(f"Error saving tariff: {str(e)}")
 
     return tariff
 
 
+@timed_stage("tariff_repository.update_tariff")
 async def update_tariff(
     session: AsyncSession,
     tariff: Tariff,
@@ -71,18 +145,40 @@ async def update_tariff(
 
     for key, value in update_data.items():
         setattr(tariff, key, value)
-
-    await session.commit()
-    await session.refresh(tariff)
-    await tariff.log_update(update_data)
+    if tariff.valid_from > tariff.valid_to:
+        # daterange() in the exclusion constraint rejects inverted periods.
+        await session.rollback()
+        raise HTTPException(
+            status_code=400,
+            detail="'valid_from' must be the date, no later than 'valid_to'.",
+        )
+    tariff_id = tariff.id
+    period = (tariff.cargo_type, tariff.valid_from, tariff.valid_to)
+
+    await tariff.log_update(session, update_data)
+    try:
+        version = await bump_tariff_version(session, upserts=[tariff])
+        await commit_and_log(session)
+    except IntegrityError as e:
+        await session.rollback()
+        discard_pending_logs(session)
+        if is_overlap_violation(e):
+            raise await overlap_violation_error(
+                session, [period], exclude_id=tariff_id
+            )
+        raise
+    tariff_index.apply_change(version, upsert=tariff)
 
     return tariff
 
 
+@timed_stage("tariff_repository.delete_tariff")
 async def delete_tariff(session: AsyncSession, tariff: Tariff) -> None:
     """
     Delete a tariff from the database.
     """
-    await tariff.log_deletion()
+    await tariff.log_deletion(session)
     await session.delete(tariff)
-    await session.commit()
+    version = await bump_tariff_version(session, deleted_ids=[tariff.id])
+    await commit_and_log(session)
+    tariff_index.apply_change(version, deleted=tariff)
@@ -1,22 +1,114 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
-from starlette.responses import RedirectResponse
+from starlette.responses import PlainTextResponse, RedirectResponse
 
 from app.api.router import router
 from app.core.config import settings
+from app.core.kafka import get_kafka_producer, shutdown_kafka_producer
 from app.core.logging import setup_logging
+from app.core.metrics import metrics
+from app.core.middleware import MetricsMiddleware, SQLProfilerMiddleware
+from app.db.database import db
+from app.db.profiler import install_sql_profiler
+from app.services.idempotency import idempotency_key_purge
+from app.services.kafka import log_pipeline
+from app.services.outbox import outbox_relay
+from app.services.partitions import partition_maintenance
+from app.services.tariff_events import tariff_listener
+from app.services.tariff_index import tariff_index
 
 setup_logging()
+logger = logging.getLogger("app")
+
+
+async def warm_up():
+    """
+    Prepare the worker before it takes traffic.
+
+    Steps run concurrently and are bounded by `warm_up_timeout`; a failing
+    one is only logged, since the pool, the producer and the tariff index
+    are all created lazily on first use as well.
+    """
+    steps = {
+        "database pool": db.warm_up(),
+        "Kafka producer": get_kafka_producer(),
+    }
+    if settings.tariff_index_enabled:
+        steps["tariff index"] = tariff_index.preload()
+
+    results = await asyncio.gather(
+        *(
+            asyncio.wait_for(step, settings.warm_up_timeout)
+            for step in steps.values()
+        ),
+        return_exceptions=True,
+    )
+    for name, result in zip(steps, results):
+        if isinstance(result, Exception):
+            logger.warning(f"Failed to warm up the {name}: {result!r}")
+    logger.info("Warm-up finished.")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if settings.warm_up_on_startup:
+        await warm_up()
+    log_pipeline.start()
+    relay_outbox = (
+        settings.log_delivery_mode == "outbox" and settings.outbox_relay_enabled
+    )
+    if relay_outbox:
+        outbox_relay.start()
+    if settings.tariff_listener_enabled:
+        tariff_listener.start()
+    if settings.partition_maintenance_enabled:
+        partition_maintenance.start()
+    if settings.idempotency_purge_enabled:
+        idempotency_key_purge.start()
+    yield
+    if settings.idempotency_purge_enabled:
+        await idempotency_key_purge.stop()
+    if settings.partition_maintenance_enabled:
+        await partition_maintenance.stop()
+    if settings.tariff_listener_enabled:
+        await tariff_listener.stop()
+    if relay_outbox:
+        await outbox_relay.stop()
+    await log_pipeline.stop()
+    await shutdown_kafka_producer()
+    await db.engine.dispose()
+
 
 app = FastAPI(
     title=settings.project_name,
     description="Service for managing tariffs and calculating insurance",
     version=settings.version,
     debug=settings.debug,
+    lifespan=lifespan,
 )
 
+if settings.metrics_enabled:
+    app.add_middleware(MetricsMiddleware)
+
+if settings.sql_profiling_enabled:
+    install_sql_profiler(db.engine)
+    app.add_middleware(
+        SQLProfilerMiddleware, slowest_limit=settings.sql_profile_slowest
+    )
+
 app.include_router(router, prefix=settings.api_prefix)
 
 
 @app.get("/", include_in_schema=False)
 async def redirect_to_docs():
     return RedirectResponse(url="/docs")
+
+
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    return PlainTextResponse(
+        metrics.render(), media_type="text/plain; version=0.0.4"
+    )
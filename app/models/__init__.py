@@ -1,11 +1,14 @@
 __all__ = (
     "Base",
     "Tariff",
+    "TariffVersion",
     "InsuranceRequest",
+    "IdempotencyKey",
     "ActionLog",
+    "OutboxEvent",
 )
 
 from .base import Base
-from .insurance import InsuranceRequest
-from .logs import ActionLog
-from .tariff import Tariff
+from .insurance import IdempotencyKey, InsuranceRequest
+from .logs import ActionLog, OutboxEvent
+from .tariff import Tariff, TariffVersion
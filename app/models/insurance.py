@@ -1,12 +1,12 @@
 from datetime import datetime
 
-from sqlalchemy import DateTime, Enum, Float, Integer
+from sqlalchemy import JSON, DateTime, Enum, Float, Index, Integer, String
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Mapped, mapped_column
 
 from app.core.config import settings
 from app.models.base import Base
 from app.models.tariff import CargoType
-from app.services.kafka import add_to_log_buffer
 
 
 class InsuranceRequest(Base):
@@ -15,6 +15,10 @@ class InsuranceRequest(Base):
     """
 
     __tablename__ = "insurance_requests"
+    # The table is partitioned by month on `timestamp`, see app.services.partitions.
+    __table_args__ = (
+        Index("ix_insurance_requests_timestamp", "timestamp", postgresql_using="brin"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
     cargo_type: Mapped[CargoType] = mapped_column(Enum(CargoType), nullable=False)
@@ -23,15 +27,41 @@ class InsuranceRequest(Base):
     timestamp: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
     user_id: Mapped[int | None] = mapped_column(Integer, nullable=True)
 
-    async def log_creation(self):
-        await add_to_log_buffer(
+    def creation_details(self) -> dict:
+        return {
+            "cargo_type": self.cargo_type,
+            "declared_value": self.declared_value,
+            "insurance_cost": self.insurance_cost,
+            "calculation_date": self.timestamp.isoformat(),
+        }
+
+    async def log_creation(self, session: AsyncSession):
+        # Imported here: the log pipeline imports the models itself.
+        from app.services.kafka import record_action
+
+        await record_action(
+            session,
             topic=settings.kafka_topic_insurance,
             action="CREATE_INSURANCE_REQUEST",
-            details={
-                "cargo_type": self.cargo_type,
-                "declared_value": self.declared_value,
-                "insurance_cost": self.insurance_cost,
-                "calculation_date": self.timestamp.isoformat(),
-            },
+            details=self.creation_details(),
             user_id=self.user_id,
         )
+
+
+class IdempotencyKey(Base):
+    """
+    Response stored for an Idempotency-Key sent with an insurance calculation.
+
+    The row is written in the same transaction as the insurance request it
+    answers but has no foreign key to it, so `insurance_requests` can be
+    partitioned.
+    """
+
+    __tablename__ = "idempotency_keys"
+
+    key: Mapped[str] = mapped_column(String(255), primary_key=True)
+    request_hash: Mapped[str] = mapped_column(String(64), nullable=False)
+    response: Mapped[dict] = mapped_column(JSON, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime, default=datetime.utcnow, index=True
+    )
@@ -1,6 +1,6 @@
 from datetime import datetime
 
-from sqlalchemy import DateTime, Integer, JSON, String
+from sqlalchemy import DateTime, Index, Integer, JSON, String
 from sqlalchemy.orm import Mapped, mapped_column
 
 from app.models.base import Base
@@ -12,9 +12,27 @@ class ActionLog(Base):
     """
 
     __tablename__ = "action_logs"
+    # The table is partitioned by month on `timestamp`, see app.services.partitions.
+    __table_args__ = (
+        Index("ix_action_logs_timestamp", "timestamp", postgresql_using="brin"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
     action: Mapped[str] = mapped_column(String, nullable=False)
     payload: Mapped[dict] = mapped_column(JSON, nullable=False)
     timestamp: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
     user_id: Mapped[int | None] = mapped_column(Integer, nullable=True)
+
+
+class OutboxEvent(Base):
+    """
+    Log event written in the business transaction and relayed to Kafka later.
+    """
+
+    # Rows are deleted once relayed, so every row is pending.
+    __tablename__ = "outbox_events"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    topic: Mapped[str] = mapped_column(String, nullable=False)
+    message: Mapped[dict] = mapped_column(JSON, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
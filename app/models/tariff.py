@@ -1,11 +1,12 @@
 import enum
 
-from sqlalchemy import Date, Enum, Float
+from sqlalchemy import BigInteger, Date, Enum, Float, Index, text
+from sqlalchemy.dialects.postgresql import ExcludeConstraint
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Mapped, mapped_column
 
 from app.core.config import settings
 from app.models.base import Base
-from app.services.kafka import add_to_log_buffer
 
 
 class CargoType(enum.Enum):
@@ -24,12 +25,32 @@ class CargoType(enum.Enum):
         return None
 
 
+TARIFF_PERIOD_CONSTRAINT = "tariffs_no_overlapping_periods"
+
+
 class Tariff(Base):
     """
     Model representing insurance tariffs for different types of cargo.
     """
 
     __tablename__ = "tariffs"
+    __table_args__ = (
+        Index("ix_tariffs_cargo_type_id", "cargo_type", "id"),
+        Index("ix_tariffs_valid_from_valid_to", "valid_from", "valid_to"),
+        Index(
+            "ix_tariffs_cargo_type_period",
+            "cargo_type",
+            "valid_from",
+            "valid_to",
+            postgresql_include=["id", "rate"],
+        ),
+        ExcludeConstraint(
+            (text("cargotype_key(cargo_type)"), "="),
+            (text("daterange(valid_from, valid_to, '[]')"), "&&"),
+            name=TARIFF_PERIOD_CONSTRAINT,
+            using="gist",
+        ),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
     cargo_type: Mapped[CargoType] = mapped_column(
@@ -39,27 +60,37 @@ class Tariff(Base):
     valid_from: Mapped[Date] = mapped_column(Date, nullable=False)
     valid_to: Mapped[Date] = mapped_column(Date, nullable=False)
 
-    async def log_creation(self):
+    def creation_details(self) -> dict:
+        return {
+            "id": self.id,
+            "cargo_type": self.cargo_type.value,
+            "rate": self.rate,
+            "valid_from": self.valid_from.isoformat(),
+            "valid_to": self.valid_to.isoformat(),
+        }
+
+    async def log_creation(self, session: AsyncSession):
         """
         Log the creation of a tariff.
         """
-        await add_to_log_buffer(
+        # Imported here: the log pipeline imports the models itself.
+        from app.services.kafka import record_action
+
+        await record_action(
+            session,
             topic=settings.kafka_topic_tariffs,
             action="CREATE_TARIFF",
-            details={
-                "id": self.id,
-                "cargo_type": self.cargo_type.value,
-                "rate": self.rate,
-                "valid_from": self.valid_from.isoformat(),
-                "valid_to": self.valid_to.isoformat(),
-            },
+            details=self.creation_details(),
         )
 
-    async def log_update(self, updated_fields: dict):
+    async def log_update(self, session: AsyncSession, updated_fields: dict):
         """
         Log the update of a tariff.
         """
-        await add_to_log_buffer(
+        from app.services.kafka import record_action
+
+        await record_action(
+            session,
             topic=settings.kafka_topic_tariffs,
             action="UPDATE_TARIFF",
             details={
@@ -68,11 +99,14 @@ class Tariff(Base):
             },
         )
 
-    async def log_deletion(self):
+    async def log_deletion(self, session: AsyncSession):
         """
         Log the deletion of a tariff.
         """
-        await add_to_log_buffer(
+        from app.services.kafka import record_action
+
+        await record_action(
+            session,
             topic=settings.kafka_topic_tariffs,
             action="DELETE_TARIFF",
             details={
@@ -80,3 +114,14 @@ class Tariff(Base):
                 "cargo_type": self.cargo_type.value,
             },
         )
+
+
+class TariffVersion(Base):
+    """
+    Single-row counter bumped in the same transaction as every tariff change.
+    """
+
+    __tablename__ = "tariff_versions"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    version: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
@@ -1,8 +1,9 @@
-from datetime import datetime
-from typing import Optional
+from datetime import date, datetime
+from typing import Literal, Optional
 
 from pydantic import BaseModel, ConfigDict, Field
 
+from app.core.config import settings
 from app.models.tariff import CargoType
 from app.schemas.tariff import TariffResponse
 
@@ -16,6 +17,12 @@ class InsuranceCreate(InsuranceBase):
     user_id: Optional[int] = None
 
 
+class InsuranceBatchCreate(BaseModel):
+    items: list[InsuranceCreate] = Field(
+        ..., min_length=1, max_length=settings.insurance_batch_max_size
+    )
+
+
 class InsuranceResponse(BaseModel):
     model_config = ConfigDict(from_attributes=True)
     id: int
@@ -25,3 +32,15 @@ class InsuranceResponse(BaseModel):
     timestamp: datetime
     user_id: Optional[int] = None
     tariff: TariffResponse
+
+
+class InsuranceExportQuery(BaseModel):
+    """
+    Query parameters of the insurance request export.
+    """
+
+    format: Literal["ndjson", "csv"] = "ndjson"
+    date_from: date | None = Field(None, description="First calculation day, inclusive.")
+    date_to: date | None = Field(None, description="Last calculation day, inclusive.")
+    cargo_type: CargoType | None = None
+    user_id: int | None = None
@@ -42,6 +42,17 @@ class TariffJsonItem(BaseModel):
     rate: float = Field(..., description="Rate for the cargo type.")
 
 
+class TariffNdjsonItem(TariffJsonItem):
+    """
+    One line of an NDJSON tariff import stream.
+    """
+
+    valid_from: date
+    valid_to: date | None = Field(
+        None, description="Defaults to 30 days after 'valid_from'."
+    )
+
+
 class TariffJsonInput(BaseModel):
     tariffs: dict[date, list[TariffJsonItem]] = Field(
         ...,
@@ -58,6 +69,25 @@ class TariffJsonInput(BaseModel):
     )
 
 
+class TariffListQuery(BaseModel):
+    """
+    Query parameters of the paginated tariff listing.
+    """
+
+    limit: int = Field(100, ge=1, le=1000)
+    after_id: int | None = Field(
+        None, description="Cursor: return tariffs with an ID greater than this one."
+    )
+    cargo_type: CargoType | None = None
+    active_on: date | None = Field(
+        None, description="Only tariffs whose period contains this date."
+    )
+    valid_from_gte: date | None = None
+    valid_from_lte: date | None = None
+    valid_to_gte: date | None = None
+    valid_to_lte: date | None = None
+
+
 class TariffResponse(BaseModel):
     model_config = ConfigDict(from_attributes=True)
     id: int
@@ -65,3 +95,16 @@ class TariffResponse(BaseModel):
     rate: float
     valid_from: date
     valid_to: date
+
+
+class TariffImportChunkResult(BaseModel):
+    chunk: int
+    received: int
+    inserted: int
+    status: str
+    detail: str | None = None
+
+
+class TariffImportResponse(BaseModel):
+    status: str
+    chunks: list[TariffImportChunkResult]
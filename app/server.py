@@ -0,0 +1,29 @@
+import uvicorn
+
+from app.core.config import settings
+
+
+def main():
+    """
+    Run the API under uvicorn with the production server settings.
+
+    Every worker process runs the application lifespan on its own: it warms
+    its connection pool, Kafka producer and tariff index before serving, and
+    drains its log pipeline when uvicorn shuts it down.
+    """
+    uvicorn.run(
+        "app.main:app",
+        host=settings.server_host,
+        port=settings.server_port,
+        workers=settings.server_workers,
+        loop=settings.server_loop,
+        http=settings.server_http,
+        lifespan="on",
+        proxy_headers=True,
+        access_log=settings.server_access_log,
+        timeout_graceful_shutdown=settings.server_timeout_graceful_shutdown,
+    )
+
+
+if __name__ == "__main__":
+    main()
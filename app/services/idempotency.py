@@ -0,0 +1,198 @@
+import asyncio
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Optional
+
+from fastapi import HTTPException
+from pydantic import BaseModel
+
+from app.core.config import settings
+from app.db.database import db
+from app.db.repository.idempotency import delete_idempotency_keys_before
+
+logger = logging.getLogger("app")
+
+StoredResponse = tuple[str, dict]
+
+
+def request_fingerprint(request: BaseModel) -> str:
+    return hashlib.sha256(request.model_dump_json().encode("utf-8")).hexdigest()
+
+
+def check_fingerprint(stored_hash: str, request_hash: str):
+    if stored_hash != request_hash:
+        raise HTTPException(
+            status_code=422,
+            detail="Idempotency-Key has already been used with a different request.",
+        )
+
+
+class IdempotencyStore:
+    """
+    Bounded in-memory store of responses per idempotency key, with TTL eviction.
+
+    Requests with a key that is currently being processed wait for the one
+    computation in flight instead of running their own (single-flight).
+    Entries hold the request fingerprint next to the response, so callers
+    can reject a key reused for a different request.
+    """
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: OrderedDict[str, tuple[float, StoredResponse]] = OrderedDict()
+        self._in_flight: dict[str, asyncio.Future] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> StoredResponse | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, stored = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return stored
+
+    def put(self, key: str, stored: StoredResponse):
+        self._entries[key] = (time.monotonic() + self.ttl, stored)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def run(
+        self, key: str, compute: Callable[[], Awaitable[StoredResponse]]
+    ) -> StoredResponse:
+        """
+        Return the stored response for `key`, computing it at most once at a time.
+        """
+        stored = self.get(key)
+        if stored is not None:
+            return stored
+
+        in_flight = self._in_flight.get(key)
+        if in_flight is not None:
+            return await asyncio.shield(in_flight)
+
+        future = asyncio.get_running_loop().create_future()
+        # Mark the outcome as retrieved even if nobody else was waiting for it.
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._in_flight[key] = future
+        try:
+            stored = await compute()
+        except asyncio.CancelledError:
+            future.set_exception(
+                HTTPException(
+                    status_code=409,
+                    detail="The request holding this Idempotency-Key was interrupted.",
+                )
+            )
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        else:
+            self.put(key, stored)
+            future.set_result(stored)
+            return stored
+        finally:
+            del self._in_flight[key]
+
+
+insurance_idempotency = IdempotencyStore(
+    max_entries=settings.idempotency_cache_max_entries,
+    ttl=settings.idempotency_cache_ttl,
+)
+
+
+async def purge_expired_idempotency_keys() -> int:
+    """
+    Delete stored idempotency keys older than `idempotency_key_ttl`.
+
+    Rows go in batches of `idempotency_purge_batch_size`, each in its own
+    transaction, so a large backlog never holds locks for long.
+    """
+    cutoff = datetime.utcnow() - timedelta(seconds=settings.idempotency_key_ttl)
+    purged = 0
+    while True:
+        async with db.session_factory() as session:
+            deleted = await delete_idempotency_keys_before(
+                session, cutoff, settings.idempotency_purge_batch_size
+            )
+            await session.commit()
+        purged += deleted
+        if deleted < settings.idempotency_purge_batch_size:
+            break
+
+    if purged:
+        logger.info(f"Purged {purged} expired idempotency keys.")
+    return purged
+
+
+class IdempotencyKeyPurge:
+    """
+    Background task that runs `purge_expired_idempotency_keys` every
+    `interval` seconds until stopped.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+        self._stop_event = asyncio.Event()
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._stop_event.clear()
+            self._task = asyncio.create_task(self.run())
+            logger.info("Idempotency key purge started.")
+
+    async def stop(self):
+        if self._task is None:
+            return
+
+        self._stop_event.set()
+        await self._task
+        self._task = None
+        logger.info("Idempotency key purge stopped.")
+
+    async def run(self):
+        while not self._stop_event.is_set():
+            try:
+                await purge_expired_idempotency_keys()
+            except Exception as e:
+                logger.error(
+                    f"Failed to purge expired idempotency keys: {e}", exc_info=True
+                )
+
+            try:
+                await asyncio.wait_for(self._stop_event.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+
+
+idempotency_key_purge = IdempotencyKeyPurge(
+    interval=settings.idempotency_purge_interval
+)
+
+
+async def main():
+    """
+    Purge expired idempotency keys once as a standalone process, e.g. from cron.
+    """
+    try:
+        await purge_expired_idempotency_keys()
+    finally:
+        await db.engine.dispose()
+
+
+if __name__ == "__main__":
+    from app.core.logging import setup_logging
+
+    setup_logging()
+    asyncio.run(main())
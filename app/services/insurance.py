@@ -1,106 +1,225 @@
+import csv
+import io
+import json
 from datetime import date
+from typing import AsyncIterator
 
 from fastapi import HTTPException
-from sqlalchemy import asc, desc, select
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db.repository.insurance import create_insurance_request
+from app.core.config import settings
+from app.core.metrics import stage_timer
+from app.db.database import db as database
+from app.db.repository.idempotency import add_idempotency_key, get_idempotency_key
+from app.db.repository.insurance import (
+    EXPORT_COLUMNS,
+    create_insurance_request,
+    create_insurance_requests,
+    stream_insurance_requests,
+)
+from app.db.repository.tariff import resolve_tariff
 from app.models.tariff import CargoType, Tariff
-from app.schemas.insurance import InsuranceCreate, InsuranceResponse
+from app.schemas.insurance import (
+    InsuranceCreate,
+    InsuranceExportQuery,
+    InsuranceResponse,
+)
 from app.schemas.tariff import TariffResponse
+from app.services.idempotency import (
+    StoredResponse,
+    check_fingerprint,
+    insurance_idempotency,
+    request_fingerprint,
+)
+from app.services.kafka import commit_and_log, record_actions
+from app.services.tariff_index import tariff_index
 
 
 async def calculate_insurance_service(
-    request: InsuranceCreate, db: AsyncSession
+    request: InsuranceCreate,
+    db: AsyncSession,
+    idempotency_key: str | None = None,
+    request_hash: str | None = None,
 ) -> InsuranceResponse:
     calc_date = date.today()
 
-    tariff = await get_valid_tariff(db, request.cargo_type, calc_date)
+    with stage_timer("insurance.tariff_lookup"):
+        tariff = await get_valid_tariff(db, request.cargo_type, calc_date)
     insurance_cost = request.declared_value * tariff.rate
 
-    insurance_request = await create_insurance_request(
-        db, insurance_data=request, insurance_cost=insurance_cost
-    )
-
-    await db.commit()
-    await db.refresh(insurance_request)
-
-    await insurance_request.log_creation()
-
-    tariff_response = TariffResponse(
-        id=tariff.id,
-        cargo_type=tariff.cargo_type,
-        rate=tariff.rate,
-        valid_from=tariff.valid_from,
-        valid_to=tariff.valid_to,
-    )
+    # The flush reads the generated id back with INSERT ... RETURNING and the
+    # session does not expire on commit, so no refresh is needed afterwards.
+    with stage_timer("insurance.insert"):
+        insurance_request = await create_insurance_request(
+            db, insurance_data=request, insurance_cost=insurance_cost
+        )
+        await db.flush()
 
-    return InsuranceResponse(
+    response = InsuranceResponse(
         id=insurance_request.id,
         cargo_type=insurance_request.cargo_type,
         declared_value=insurance_request.declared_value,
         insurance_cost=insurance_request.insurance_cost,
         timestamp=insurance_request.timestamp,
-        tariff=tariff_response,
+        tariff=TariffResponse.model_validate(tariff),
     )
+    if idempotency_key is not None:
+        add_idempotency_key(
+            db, idempotency_key, request_hash, response.model_dump(mode="json")
+        )
 
+    with stage_timer("insurance.log_creation"):
+        await insurance_request.log_creation(db)
+    with stage_timer("insurance.commit"):
+        await commit_and_log(db)
+
+    return response
 
-async def get_valid_tariff(
-    db: AsyncSession, cargo_type: CargoType, calc_date: date
-) -> Tariff:
-    query_current = (
-        select(Tariff)
-        .where(
-            Tariff.cargo_type == cargo_type,
-            Tariff.valid_from <= calc_date,
-            Tariff.valid_to >= calc_date,
-        )
-        .order_by(desc(Tariff.valid_from))
-    )
-    result = await db.execute(query_current)
-    tariff = result.scalars().first()
 
-    if tariff:
-        return tariff
+async def calculate_insurance_idempotent(
+    request: InsuranceCreate, db: AsyncSession, idempotency_key: str
+) -> InsuranceResponse:
+    """
+    Calculate insurance at most once per idempotency key.
+
+    Retries are answered from the in-memory store, or from the
+    `idempotency_keys` table when the key was handled by another worker or
+    before a restart. Concurrent requests with the same key share a single
+    calculation.
+    """
+    request_hash = request_fingerprint(request)
+
+    async def compute() -> StoredResponse:
+        record = await get_idempotency_key(db, idempotency_key)
+        if record is None:
+            try:
+                response = await calculate_insurance_service(
+                    request, db, idempotency_key, request_hash
+                )
+                return request_hash, response.model_dump(mode="json")
+            except IntegrityError:
+                # Another worker committed the same key first.
+                await db.rollback()
+                record = await get_idempotency_key(db, idempotency_key)
+                if record is None:
+                    raise
+        return record.request_hash, record.response
+
+    stored_hash, response = await insurance_idempotency.run(idempotency_key, compute)
+    check_fingerprint(stored_hash, request_hash)
+    return InsuranceResponse.model_validate(response)
+
+
+async def calculate_insurance_batch_service(
+    requests: list[InsuranceCreate], db: AsyncSession
+) -> list[InsuranceResponse]:
+    """
+    Price a batch of cargo lines with one tariff resolution per cargo type,
+    one INSERT ... RETURNING and one batch of log events.
+    """
+    calc_date = date.today()
 
-    query_future = (
-        select(Tariff)
-        .where(
-            Tariff.cargo_type == cargo_type,
-            Tariff.valid_from > calc_date,
+    tariffs = {
+        cargo_type: TariffResponse.model_validate(
+            await get_valid_tariff(db, cargo_type, calc_date)
         )
-        .order_by(asc(Tariff.valid_from))
+        for cargo_type in {request.cargo_type for request in requests}
+    }
+    insurance_costs = [
+        request.declared_value * tariffs[request.cargo_type].rate
+        for request in requests
+    ]
+
+    insurance_requests = await create_insurance_requests(
+        db, insurance_data=requests, insurance_costs=insurance_costs
     )
-    result = await db.execute(query_future)
-    future_tariff = result.scalars().first()
-
-    query_past = (
-        select(Tariff)
-        .where(
-            Tariff.cargo_type == cargo_type,
-            Tariff.valid_to < calc_date,
-        )
-        .order_by(desc(Tariff.valid_to))
+    await record_actions(
+        db,
+        topic=settings.kafka_topic_insurance,
+        action="CREATE_INSURANCE_REQUEST",
+        entries=[
+            (insurance_request.creation_details(), insurance_request.user_id)
+            for insurance_request in insurance_requests
+        ],
     )
-    result = await db.execute(query_past)
-    past_tariff = result.scalars().first()
-
-    if future_tariff and past_tariff:
-        delta_future = (future_tariff.valid_from - calc_date).days
-        delta_past = (calc_date - past_tariff.valid_to).days
-
-        if delta_future < delta_past:
-            tariff = future_tariff
-        else:
-            tariff = past_tariff
-    elif future_tariff:
-        tariff = future_tariff
-    elif past_tariff:
-        tariff = past_tariff
+    await commit_and_log(db)
+
+    return [
+        InsuranceResponse(
+            id=insurance_request.id,
+            cargo_type=insurance_request.cargo_type,
+            declared_value=insurance_request.declared_value,
+            insurance_cost=insurance_request.insurance_cost,
+            timestamp=insurance_request.timestamp,
+            user_id=insurance_request.user_id,
+            tariff=tariffs[insurance_request.cargo_type],
+        )
+        for insurance_request in insurance_requests
+    ]
+
+
+async def get_valid_tariff(
+    db: AsyncSession, cargo_type: CargoType, calc_date: date
+) -> Tariff | TariffResponse:
+    """
+    Resolve the tariff for `calc_date`, preferring the in-process tariff index.
+    """
+    if settings.tariff_index_enabled:
+        await tariff_index.ensure_fresh(db)
+        tariff = tariff_index.resolve(cargo_type, calc_date)
     else:
+        tariff = await resolve_tariff(db, cargo_type, calc_date)
+
+    if tariff is None:
         raise HTTPException(
             status_code=404,
             detail=f"No valid tariff found for cargo type '{cargo_type}' on {calc_date}",
         )
-
     return tariff
+
+
+def _export_values(row) -> list:
+    return [
+        row.id,
+        row.cargo_type.value,
+        row.declared_value,
+        row.insurance_cost,
+        row.timestamp.isoformat(),
+        row.user_id,
+    ]
+
+
+def _render_ndjson(rows) -> bytes:
+    return "".join(
+        json.dumps(dict(zip(EXPORT_COLUMNS, _export_values(row)))) + "\n"
+        for row in rows
+    ).encode("utf-8")
+
+
+def _render_csv(rows) -> bytes:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(_export_values(row) for row in rows)
+    return buffer.getvalue().encode("utf-8")
+
+
+async def export_insurance_requests(
+    query: InsuranceExportQuery,
+) -> AsyncIterator[bytes]:
+    """
+    Render matching insurance requests as NDJSON or CSV, one chunk at a time.
+
+    The export opens its own session because the request-scoped one is closed
+    before a streaming response body is sent.
+    """
+    render = _render_csv if query.format == "csv" else _render_ndjson
+    if query.format == "csv":
+        buffer = io.StringIO()
+        csv.writer(buffer).writerow(EXPORT_COLUMNS)
+        yield buffer.getvalue().encode("utf-8")
+
+    async with database.session_factory() as session:
+        async for rows in stream_insurance_requests(
+            session, query, chunk_size=settings.export_chunk_size
+        ):
+            yield render(rows)
@@ -1,22 +1,35 @@
 import asyncio
 import logging
-from asyncio import Lock
+import time
 from datetime import date, datetime
 from enum import Enum
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.config import settings
-from app.core.kafka import produce_message
+from app.core.kafka import produce_messages
+from app.core.metrics import metrics
 from app.db.database import db
-from app.db.repository.logs import save_action_log
+from app.db.repository.logs import action_log_entry, save_action_logs
+from app.models.logs import OutboxEvent
+from .log_spill import LogSpill
 
 logger = logging.getLogger("app")
 
-LOG_BUFFER: List[Dict] = []
-BUFFER_LOCK = Lock()
 FLUSH_INTERVAL = settings.flush_interval
 BATCH_SIZE = settings.batch_size
 
+PENDING_LOGS_KEY = "pending_logs"
+
+_STOP = object()
+
+LOG_FLUSH_DURATION = metrics.histogram(
+    "log_flush_duration_seconds",
+    "Time to write a batch of logs to the database and Kafka.",
+)
+
 
 def convert_to_serializable(data: dict) -> dict:
     """Converts non-serializable objects (dates, enums, etc.) in a dictionary to serializable formats."""
@@ -34,85 +47,399 @@ def convert_to_serializable(data: dict) -> dict:
     return data
 
 
-async def flush_logs_to_kafka():
-    """Flush all accumulated logs from the buffer to Kafka and save them to the database."""
-    async with BUFFER_LOCK:
-        if not LOG_BUFFER:
-            return
+async def flush_logs_to_kafka(batch: List[Dict]) -> bool:
+    """Send a batch of logs to Kafka and save them to the database.
 
-        batch = LOG_BUFFER[:]
-        LOG_BUFFER.clear()
+    Returns False when the batch could not be delivered.
+    """
+    if not batch:
+        return True
 
     logger.info(f"Flushing {len(batch)} logs to Kafka and database.")
 
+    start = time.perf_counter()
     session = db.session_factory()
 
     try:
         async with session.begin():
+            messages = []
             for item in batch:
                 message = convert_to_serializable(item["message"])
-                topic = item["topic"]
-
-                await save_action_log(
-                    session,
-                    action=message["action"],
-                    payload=message["details"],
-                    user_id=message["user_id"],
-                )
+                messages.append((item["topic"], message))
 
-                await produce_message(topic, message)
+            await save_action_logs(
+                session, [action_log_entry(message) for _, message in messages]
+            )
+            await produce_messages(messages)
+        return True
 
     except Exception as e:
         logger.error(f"Failed to process log batch: {e}", exc_info=True)
         logger.info("Database transaction rolled back")
+        return False
     finally:
         await session.close()
+        LOG_FLUSH_DURATION.observe(time.perf_counter() - start)
+
+
+class LogPipeline:
+    """
+    Bounded queue of log events drained by a single background consumer.
+
+    Producers only enqueue; the consumer flushes a batch once it holds
+    `batch_size` events or its oldest event is `flush_interval` seconds old.
+    When the queue is full, `overflow_policy` decides between waiting for
+    space ("block"), discarding the new event ("drop_newest") or discarding
+    the oldest queued one ("drop_oldest").
+
+    With a `spill`, batches that fail to flush and events still held when
+    the consumer is cancelled are written to disk, and the segments left by
+    earlier runs are replayed in the background on start, in batches of
+    `replay_batch_size` (default `batch_size`).
+    """
+
+    def __init__(
+        self,
+        max_size: int,
+        batch_size: int,
+        flush_interval: float,
+        overflow_policy: str = "block",
+        spill: Optional[LogSpill] = None,
+        replay_batch_size: Optional[int] = None,
+    ):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_size)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.overflow_policy = overflow_policy
+        self.spill = spill
+        self.replay_batch_size = replay_batch_size or batch_size
+        self.dropped = 0
+        self._task: Optional[asyncio.Task] = None
+        self._replay_task: Optional[asyncio.Task] = None
+        self._in_flight: List[Dict] = []
+        self._stopped = False
+
+    @property
+    def depth(self) -> int:
+        return self.queue.qsize()
+
+    def start(self):
+        """
+        Start the consumer task on the running event loop.
+        """
+        if self._task is None or self._task.done():
+            self._stopped = False
+            self._task = asyncio.create_task(self._run())
+            if self.spill is not None:
+                self._replay_task = asyncio.create_task(self._replay())
+            logger.info("Log pipeline started.")
+
+    async def stop(self):
+        """
+        Stop the consumer once every queued event has been flushed.
+        """
+        if self._task is None:
+            return
+
+        self._stopped = True
+        try:
+            self.queue.put_nowait(_STOP)
+        except asyncio.QueueFull:
+            # The consumer checks the flag before it waits on an empty queue.
+            pass
+        await self._task
+        self._task = None
+        if self._replay_task is not None:
+            await self._replay_task
+            self._replay_task = None
+        if self.spill is not None:
+            self.spill.close()
+        logger.info("Log pipeline stopped.")
+
+    async def put(self, item: Dict):
+        if (self._task is None or self._task.done()) and not self._stopped:
+            self.start()
+
+        if self.overflow_policy == "block":
+            await self.queue.put(item)
+            return
+
+        try:
+            self.queue.put_nowait(item)
+            return
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+        if self.overflow_policy == "drop_oldest":
+            self.queue.get_nowait()
+            self.queue.put_nowait(item)
+        logger.warning(
+            f"Log queue is full, dropped an event ({self.dropped} dropped so far)."
+        )
+
+    async def put_many(self, items: List[Dict]):
+        for item in items:
+            await self.put(item)
+
+    def _drain_into(self, batch: List[Dict], limit: int) -> bool:
+        """
+        Move already queued events into `batch` without waiting.
+
+        Returns True once the pipeline is stopping and nothing is left to read.
+        """
+        while len(batch) < limit:
+            try:
+                item = self.queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return self._stopped
+            if item is _STOP:
+                return True
+            batch.append(item)
+        return False
+
+    async def _next_batch(self) -> Tuple[List[Dict], bool]:
+        # Collected events count as in flight, so a cancellation can spill them.
+        batch: List[Dict] = []
+        self._in_flight = batch
+        if self._stopped and self.queue.empty():
+            # `stop` could not enqueue the sentinel while the queue was full,
+            # so nothing would wake this consumer once it has drained it.
+            return batch, True
+        first = await self.queue.get()
+        if first is _STOP:
+            return batch, True
+        batch.append(first)
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.flush_interval
+        while len(batch) < self.batch_size:
+            if self._drain_into(batch, self.batch_size):
+                return batch, True
+            if len(batch) >= self.batch_size:
+                break
+
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                item = await asyncio.wait_for(self.queue.get(), timeout)
+            except asyncio.TimeoutError:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+
+        return batch, False
+
+    async def _flush(self, batch: List[Dict]):
+        self._in_flight = batch
+        if not await flush_logs_to_kafka(batch) and self.spill is not None:
+            await self.spill.spill(batch)
+        self._in_flight = []
+
+    def _spill_in_flight(self):
+        """
+        Synchronously spill the batch that was being collected or flushed.
+        """
+        batch, self._in_flight = self._in_flight, []
+        if self.spill is None or not batch:
+            return
+        try:
+            self.spill.write(batch)
+        except Exception as e:
+            logger.error(
+                f"Failed to spill {len(batch)} log events: {e}", exc_info=True
+            )
+
+    def _spill_remaining(self):
+        """
+        Synchronously spill the in-flight batch and everything still queued.
+        """
+        if self.spill is None:
+            return
+        remaining = list(self._in_flight)
+        self._drain_into(remaining, len(remaining) + self.queue.qsize() + 1)
+        self.spill.write(remaining)
+        self._in_flight = []
+
+    async def _replay(self):
+        try:
+            await self.spill.replay(flush_logs_to_kafka, self.replay_batch_size)
+        except Exception as e:
+            logger.error(f"Failed to replay spilled logs: {e}", exc_info=True)
+
+    async def _run(self):
+        try:
+            stopping = False
+            while not stopping:
+                # A failing batch must not end the consumer: with the "block"
+                # policy, producers would wait on the full queue forever.
+                try:
+                    batch, stopping = await self._next_batch()
+                    if batch:
+                        await self._flush(batch)
+                except Exception as e:
+                    logger.error(f"Error in log pipeline: {e}", exc_info=True)
+                    self._spill_in_flight()
+
+            remaining: List[Dict] = []
+            self._drain_into(remaining, self.queue.qsize() + 1)
+            for i in range(0, len(remaining), self.batch_size):
+                await self._flush(remaining[i : i + self.batch_size])
+        except asyncio.CancelledError:
+            self._spill_remaining()
+            logger.info("Log pipeline cancelled.")
+            raise
+        except Exception as e:
+            logger.error(f"Error in log pipeline: {e}", exc_info=True)
+            self._spill_remaining()
+
+
+log_pipeline = LogPipeline(
+    max_size=settings.log_queue_max_size,
+    batch_size=BATCH_SIZE,
+    flush_interval=FLUSH_INTERVAL,
+    overflow_policy=settings.log_queue_overflow_policy,
+    spill=(
+        LogSpill(settings.log_spill_dir, settings.log_spill_segment_max_bytes)
+        if settings.log_spill_enabled
+        else None
+    ),
+    replay_batch_size=settings.log_spill_replay_batch_size,
+)
+metrics.gauge(
+    "log_queue_depth", "Log events waiting to be flushed.", lambda: log_pipeline.depth
+)
+metrics.gauge(
+    "log_queue_dropped_events",
+    "Log events dropped because the queue was full.",
+    lambda: log_pipeline.dropped,
+)
+metrics.gauge(
+    "log_spill_events",
+    "Log events written to the local spill since start.",
+    lambda: log_pipeline.spill.spilled if log_pipeline.spill else 0,
+)
+metrics.gauge(
+    "log_spill_replayed_events",
+    "Spilled log events replayed since start.",
+    lambda: log_pipeline.spill.replayed if log_pipeline.spill else 0,
+)
+
+
+def build_log_item(
+    topic: str,
+    action: str,
+    details: dict,
+    user_id: Optional[int],
+    timestamp: str,
+) -> Dict:
+    return {
+        "message": {
+            "user_id": user_id,
+            "action": action,
+            "details": convert_to_serializable(details),
+            "timestamp": timestamp,
+        },
+        "topic": topic,
+    }
 
 
 async def add_to_log_buffer(
     topic: str, action: str, details: dict, user_id: Optional[int] = None
 ):
     """
-    Adds a log entry to the buffer and triggers a flush if the buffer reaches the batch size.
+    Queues a log entry for the background log pipeline.
     """
-    should_flush = False
+    item = build_log_item(
+        topic, action, details, user_id, datetime.utcnow().isoformat()
+    )
+    await log_pipeline.put(item)
+    logger.debug(f"Added log to buffer: {item['message']}")
 
-    message = {
-        "user_id": user_id,
-        "action": action,
-        "details": convert_to_serializable(details),
-        "timestamp": datetime.utcnow().isoformat(),
-    }
 
-    async with BUFFER_LOCK:
-        LOG_BUFFER.append({"message": message, "topic": topic})
-        logger.info(f"Added log to buffer: {message}")
+async def add_batch_to_log_buffer(
+    topic: str, action: str, entries: List[Tuple[dict, Optional[int]]]
+):
+    """
+    Queues a batch of log entries sharing one action.
+    """
+    timestamp = datetime.utcnow().isoformat()
+    await log_pipeline.put_many(
+        [
+            build_log_item(topic, action, details, user_id, timestamp)
+            for details, user_id in entries
+        ]
+    )
+    logger.debug(f"Added {len(entries)} '{action}' logs to buffer.")
 
-        if len(LOG_BUFFER) >= BATCH_SIZE:
-            logger.info(
-                "Batch size limit reached. Will trigger flush after releasing lock."
-            )
-            should_flush = True
 
-    if should_flush:
-        await flush_logs_to_kafka()
-        if (
-            not hasattr(add_to_log_buffer, "flush_task")
-            or add_to_log_buffer.flush_task.done()
-        ):
-            add_to_log_buffer.flush_task = asyncio.create_task(log_flush_loop())
+async def record_action(
+    session: AsyncSession,
+    topic: str,
+    action: str,
+    details: dict,
+    user_id: Optional[int] = None,
+):
+    """
+    Records a log entry as part of the session's current transaction.
+    """
+    await record_actions(session, topic, action, [(details, user_id)])
 
 
-async def log_flush_loop():
+async def record_actions(
+    session: AsyncSession,
+    topic: str,
+    action: str,
+    entries: List[Tuple[dict, Optional[int]]],
+):
     """
-    Adds a log entry to the buffer and triggers a flush if the buffer reaches the flush interval.
+    Records a batch of log entries as part of the session's current transaction.
+
+    In outbox mode the entries are inserted into `outbox_events` and commit
+    with the business data. Otherwise they are held on the session until
+    `publish_pending_logs` queues them once the transaction has committed.
+    """
+    timestamp = datetime.utcnow().isoformat()
+    items = [
+        build_log_item(topic, action, details, user_id, timestamp)
+        for details, user_id in entries
+    ]
+
+    if settings.log_delivery_mode == "outbox":
+        created_at = datetime.utcnow()
+        await session.execute(
+            insert(OutboxEvent.__table__),
+            [
+                {"topic": item["topic"], "message": item["message"], "created_at": created_at}
+                for item in items
+            ],
+        )
+    else:
+        session.info.setdefault(PENDING_LOGS_KEY, []).extend(items)
+
+
+async def publish_pending_logs(session: AsyncSession):
+    """
+    Queues the log entries recorded on a session whose transaction has committed.
+    """
+    await log_pipeline.put_many(session.info.pop(PENDING_LOGS_KEY, []))
+
+
+def discard_pending_logs(session: AsyncSession):
+    """
+    Drops the log entries recorded on a session whose transaction was rolled back.
+    """
+    session.info.pop(PENDING_LOGS_KEY, None)
+
+
+async def commit_and_log(session: AsyncSession):
+    """
+    Commits the session and then publishes the log entries it recorded.
     """
     try:
-        while True:
-            await asyncio.sleep(FLUSH_INTERVAL)
-            logger.info("Flush interval reached. Triggering flush.")
-            await flush_logs_to_kafka()
-    except asyncio.CancelledError:
-        logger.info("Log flush loop cancelled.")
-    except Exception as e:
-        logger.error(f"Error in log flush loop: {e}", exc_info=True)
+        await session.commit()
+    except Exception:
+        discard_pending_logs(session)
+        raise
+    await publish_pending_logs(session)
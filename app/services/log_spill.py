@@ -0,0 +1,156 @@
+import asyncio
+import fcntl
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger("app")
+
+SEGMENT_SUFFIX = ".log"
+
+
+class LogSpill:
+    """
+    Append-only segment files holding log events that could not be flushed.
+
+    Each process appends to its own segment while holding an exclusive lock
+    on it, one JSON event per line, and fsyncs once per spilled batch. A
+    segment whose lock can be taken belongs to no live writer, so it can be
+    replayed safely even when several workers share the directory; a torn
+    last line left by a crash is skipped.
+
+    File I/O runs in a worker thread, so spilling never blocks the event loop.
+    """
+
+    def __init__(self, directory: str, segment_max_bytes: int):
+        self.directory = Path(directory)
+        self.segment_max_bytes = segment_max_bytes
+        self.spilled = 0
+        self.replayed = 0
+        self._segment = None
+        self._segment_path: Optional[Path] = None
+        self._lock = threading.Lock()
+
+    def _open_segment(self):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._segment_path = self.directory / (
+            f"{time.time_ns():020d}-{os.getpid()}{SEGMENT_SUFFIX}"
+        )
+        self._segment = open(self._segment_path, "ab")
+        fcntl.flock(self._segment.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+    def _close_segment(self):
+        if self._segment is not None:
+            self._segment.close()
+            self._segment = None
+            self._segment_path = None
+
+    def write(self, items: List[Dict]) -> None:
+        """
+        Durably append a batch of events to the current segment.
+        """
+        if not items:
+            return
+
+        data = b"".join(
+            json.dumps(item, default=str).encode("utf-8") + b"\n" for item in items
+        )
+        with self._lock:
+            if self._segment is None:
+                self._open_segment()
+            self._segment.write(data)
+            self._segment.flush()
+            os.fsync(self._segment.fileno())
+            self.spilled += len(items)
+
+            if self._segment.tell() >= self.segment_max_bytes:
+                self._close_segment()
+
+    async def spill(self, items: List[Dict]) -> None:
+        await asyncio.to_thread(self.write, items)
+        logger.warning(f"Spilled {len(items)} log events to {self.directory}.")
+
+    def close(self) -> None:
+        with self._lock:
+            self._close_segment()
+
+    def _claim(self, path: Path):
+        """
+        Lock a segment no live writer holds, or return None.
+        """
+        try:
+            segment = open(path, "rb")
+        except FileNotFoundError:
+            return None
+        try:
+            fcntl.flock(segment.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            segment.close()
+            return None
+        if os.fstat(segment.fileno()).st_nlink == 0:
+            # Another worker replayed and removed it while we waited.
+            segment.close()
+            return None
+        return segment
+
+    @staticmethod
+    def _read_events(segment) -> List[Dict]:
+        events = []
+        for line in segment.read().splitlines():
+            try:
+                events.append(json.loads(line))
+            except ValueError:
+                logger.warning("Skipping a torn line in a log spill segment.")
+        return events
+
+    def _segments(self) -> List[Path]:
+        if not self.directory.is_dir():
+            return []
+        return sorted(
+            path
+            for path in self.directory.glob(f"*{SEGMENT_SUFFIX}")
+            if path != self._segment_path
+        )
+
+    async def replay(
+        self,
+        flush: Callable[[List[Dict]], Awaitable[bool]],
+        batch_size: int,
+    ) -> int:
+        """
+        Flush the events of every abandoned segment, oldest first.
+
+        A segment is deleted once all its events are flushed. If a flush
+        fails, the events not yet delivered are spilled again and the replay
+        stops until the next startup.
+        """
+        replayed = 0
+        for path in await asyncio.to_thread(self._segments):
+            segment = await asyncio.to_thread(self._claim, path)
+            if segment is None:
+                continue
+
+            try:
+                events = await asyncio.to_thread(self._read_events, segment)
+                for i in range(0, len(events), batch_size):
+                    if not await flush(events[i : i + batch_size]):
+                        await asyncio.to_thread(self.write, events[i:])
+                        await asyncio.to_thread(path.unlink)
+                        self.replayed += replayed
+                        logger.warning(
+                            f"Log spill replay stopped: {replayed} events replayed."
+                        )
+                        return replayed
+                    replayed += min(batch_size, len(events) - i)
+                await asyncio.to_thread(path.unlink)
+            finally:
+                segment.close()
+
+        self.replayed += replayed
+        if replayed:
+            logger.info(f"Replayed {replayed} spilled log events.")
+        return replayed
@@ -0,0 +1,117 @@
+import asyncio
+import logging
+from typing import Optional
+
+from sqlalchemy import delete, select
+
+from app.core.config import settings
+from app.core.kafka import produce_messages, shutdown_kafka_producer
+from app.db.database import db
+from app.db.repository.logs import action_log_entry, save_action_logs
+from app.models.logs import OutboxEvent
+
+logger = logging.getLogger("app")
+
+
+async def relay_outbox_batch(batch_size: int) -> int:
+    """
+    Deliver one batch of pending outbox events to Kafka and the action log table.
+
+    Rows are claimed with FOR UPDATE SKIP LOCKED, so several relays can drain
+    the outbox concurrently without delivering an event twice.
+    """
+    async with db.session_factory() as session:
+        async with session.begin():
+            result = await session.execute(
+                select(OutboxEvent.id, OutboxEvent.topic, OutboxEvent.message)
+                .order_by(OutboxEvent.id)
+                .limit(batch_size)
+                .with_for_update(skip_locked=True)
+            )
+            events = result.all()
+            if not events:
+                return 0
+
+            await save_action_logs(
+                session, [action_log_entry(event.message) for event in events]
+            )
+            await produce_messages([(event.topic, event.message) for event in events])
+            # Delivered rows are removed in the same transaction, so the table
+            # only ever holds pending events.
+            await session.execute(
+                delete(OutboxEvent).where(
+                    OutboxEvent.id.in_([event.id for event in events])
+                )
+            )
+
+    logger.info(f"Relayed {len(events)} outbox events.")
+    return len(events)
+
+
+class OutboxRelay:
+    """
+    Background task that keeps draining the outbox until stopped.
+    """
+
+    def __init__(self, batch_size: int, interval: float):
+        self.batch_size = batch_size
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+        self._stop_event = asyncio.Event()
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._stop_event.clear()
+            self._task = asyncio.create_task(self.run())
+            logger.info("Outbox relay started.")
+
+    async def stop(self):
+        if self._task is None:
+            return
+
+        self._stop_event.set()
+        await self._task
+        self._task = None
+        logger.info("Outbox relay stopped.")
+
+    async def _sleep(self):
+        try:
+            await asyncio.wait_for(self._stop_event.wait(), self.interval)
+        except asyncio.TimeoutError:
+            pass
+
+    async def run(self):
+        while not self._stop_event.is_set():
+            try:
+                relayed = await relay_outbox_batch(self.batch_size)
+            except Exception as e:
+                logger.error(f"Failed to relay outbox events: {e}", exc_info=True)
+                relayed = 0
+
+            # A full batch means more rows are probably waiting.
+            if relayed < self.batch_size:
+                await self._sleep()
+
+
+outbox_relay = OutboxRelay(
+    batch_size=settings.outbox_relay_batch_size,
+    interval=settings.outbox_relay_interval,
+)
+
+
+async def main():
+    """
+    Run the relay as a standalone process until interrupted.
+    """
+    try:
+        await outbox_relay.run()
+    finally:
+        await shutdown_kafka_producer()
+        await db.engine.dispose()
+
+
+if __name__ == "__main__":
+    from app.core.logging import setup_logging
+
+    setup_logging()
+    asyncio.run(main())
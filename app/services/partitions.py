@@ -0,0 +1,219 @@
+import asyncio
+import logging
+import re
+from datetime import date, datetime
+from typing import Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db.database import db
+
+logger = logging.getLogger("app")
+
+# Tables partitioned by month on `timestamp`, see migration 8d3f6a1c7e25.
+PARTITIONED_TABLES = ("action_logs", "insurance_requests")
+MAINTENANCE_LOCK_ID = 0x70617274
+_MONTH_SUFFIX = re.compile(r"_y(\d{4})m(\d{2})$")
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(table: str, month: date) -> str:
+    return f"{table}_y{month.year:04d}m{month.month:02d}"
+
+
+def partition_month(table: str, name: str) -> date | None:
+    """
+    First day of the month a partition named by `partition_name` holds.
+    """
+    match = _MONTH_SUFFIX.search(name)
+    if not name.startswith(f"{table}_") or match is None:
+        return None
+    return date(int(match[1]), int(match[2]), 1)
+
+
+def is_partition_name(name: str) -> bool:
+    """
+    Whether `name` is a monthly or default partition of a partitioned table,
+    attached or detached.
+    """
+    return any(
+        name == f"{table}_default" or partition_month(table, name) is not None
+        for table in PARTITIONED_TABLES
+    )
+
+
+def retention_months(table: str) -> int | None:
+    return {
+        "action_logs": settings.action_logs_retention_months,
+        "insurance_requests": settings.insurance_requests_retention_months,
+    }[table]
+
+
+async def list_partitions(session: AsyncSession, table: str) -> dict[date, str]:
+    """
+    Monthly partitions currently attached to `table`, by month.
+    """
+    result = await session.execute(
+        text(
+            """
+            SELECT child.relname
+            FROM pg_inherits
+            JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+            JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+            WHERE parent.relname = :table
+            """
+        ),
+        {"table": table},
+    )
+    partitions = {}
+    for name in result.scalars():
+        month = partition_month(table, name)
+        if month is not None:
+            partitions[month] = name
+    return partitions
+
+
+async def create_partition(session: AsyncSession, table: str, month: date) -> None:
+    """
+    Create and attach the partition of `table` for `month`.
+
+    Rows that landed in the default partition because the month had no
+    partition yet are moved into the new one before it is attached, which
+    would fail otherwise.
+    """
+    name = partition_name(table, month)
+    start = datetime.combine(month, datetime.min.time())
+    end = datetime.combine(add_months(month, 1), datetime.min.time())
+    await session.execute(
+        text(f"CREATE TABLE {name} (LIKE {table} INCLUDING DEFAULTS)")
+    )
+    await session.execute(
+        text(
+            f"""
+            WITH moved AS (
+                DELETE FROM {table}_default
+                WHERE timestamp >= :start AND timestamp < :end
+                RETURNING *
+            )
+            INSERT INTO {name} SELECT * FROM moved
+            """
+        ),
+        {"start": start, "end": end},
+    )
+    await session.execute(
+        text(
+            f"ALTER TABLE {table} ATTACH PARTITION {name} "
+            f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+        )
+    )
+    logger.info(f"Created partition {name}.")
+
+
+async def remove_partition(session: AsyncSession, table: str, name: str) -> None:
+    """
+    Detach an expired partition and drop it unless retention keeps detached ones.
+    """
+    await session.execute(text(f"ALTER TABLE {table} DETACH PARTITION {name}"))
+    if settings.partition_retention_mode == "drop":
+        await session.execute(text(f"DROP TABLE {name}"))
+        logger.info(f"Dropped expired partition {name}.")
+    else:
+        logger.info(f"Detached expired partition {name}.")
+
+
+async def maintain_partitions(today: date | None = None) -> None:
+    """
+    Create the monthly partitions due in the next `partition_premake_months`
+    and remove the ones older than each table's retention.
+
+    Every table is handled in its own transaction under an advisory lock, so
+    workers running the task at the same time do not race each other.
+    """
+    current = (today or datetime.utcnow().date()).replace(day=1)
+    for table in PARTITIONED_TABLES:
+        async with db.session_factory() as session:
+            async with session.begin():
+                await session.execute(
+                    text("SELECT pg_advisory_xact_lock(:id)"),
+                    {"id": MAINTENANCE_LOCK_ID},
+                )
+                partitions = await list_partitions(session, table)
+
+                for months in range(settings.partition_premake_months + 1):
+                    month = add_months(current, months)
+                    if month not in partitions:
+                        await create_partition(session, table, month)
+
+                keep = retention_months(table)
+                if keep is not None:
+                    oldest = add_months(current, -keep)
+                    for month, name in sorted(partitions.items()):
+                        if month < oldest:
+                            await remove_partition(session, table, name)
+
+
+class PartitionMaintenance:
+    """
+    Background task that runs `maintain_partitions` every `interval` seconds
+    until stopped.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+        self._stop_event = asyncio.Event()
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._stop_event.clear()
+            self._task = asyncio.create_task(self.run())
+            logger.info("Partition maintenance started.")
+
+    async def stop(self):
+        if self._task is None:
+            return
+
+        self._stop_event.set()
+        await self._task
+        self._task = None
+        logger.info("Partition maintenance stopped.")
+
+    async def run(self):
+        while not self._stop_event.is_set():
+            try:
+                await maintain_partitions()
+            except Exception as e:
+                logger.error(f"Partition maintenance failed: {e}", exc_info=True)
+
+            try:
+                await asyncio.wait_for(self._stop_event.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+
+
+partition_maintenance = PartitionMaintenance(
+    interval=settings.partition_maintenance_interval
+)
+
+
+async def main():
+    """
+    Run one maintenance pass as a standalone process, e.g. from cron.
+    """
+    try:
+        await maintain_partitions()
+    finally:
+        await db.engine.dispose()
+
+
+if __name__ == "__main__":
+    from app.core.logging import setup_logging
+
+    setup_logging()
+    asyncio.run(main())
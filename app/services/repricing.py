@@ -0,0 +1,296 @@
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from datetime import date, datetime
+from typing import Sequence
+
+from sqlalchemy import Row
+
+from app.core.config import settings
+from app.db.database import db
+from app.db.repository.insurance import (
+    get_insurance_id_bounds,
+    get_insurance_requests_chunk,
+    update_insurance_costs,
+)
+from app.models.tariff import CargoType
+from app.services.tariff_index import tariff_index
+
+logger = logging.getLogger("app")
+
+# asyncpg allows 32767 bind parameters per statement, three per repriced row.
+MAX_UPDATE_ROWS = 10000
+
+
+@dataclass(frozen=True)
+class RepricingOptions:
+    since: datetime | None = None
+    until: datetime | None = None
+    cargo_type: CargoType | None = None
+    chunk_size: int = settings.repricing_chunk_size
+    dry_run: bool = False
+
+
+@dataclass
+class RepricingResult:
+    first_id: int
+    last_id: int
+    scanned: int = 0
+    updated: int = 0
+    unpriced: int = 0
+    seconds: float = 0.0
+    tariff_version: int | None = None
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.scanned / self.seconds if self.seconds else 0.0
+
+
+def reprice_rows(
+    rows: Sequence[Row],
+) -> tuple[list[tuple[int, datetime, float]], int]:
+    """
+    Price `rows` against the tariff index and return the changed costs.
+
+    Rows are grouped by cargo type and resolved on the date of their
+    timestamp with one `resolve_many` pass per group. Returns the
+    `(id, timestamp, insurance_cost)` rows whose cost differs and the number
+    of rows no tariff was found for.
+    """
+    groups: dict[CargoType, list[Row]] = {}
+    for row in rows:
+        groups.setdefault(row.cargo_type, []).append(row)
+
+    changes = []
+    unpriced = 0
+    for cargo_type, group in groups.items():
+        tariffs = tariff_index.resolve_many(
+            cargo_type, [row.timestamp.date() for row in group]
+        )
+        for row, tariff in zip(group, tariffs):
+            if tariff is None:
+                unpriced += 1
+                continue
+            cost = row.declared_value * tariff.rate
+            if cost != row.insurance_cost:
+                changes.append((row.id, row.timestamp, cost))
+    changes.sort()
+    return changes, unpriced
+
+
+async def reprice_id_range(
+    first_id: int, last_id: int, options: RepricingOptions
+) -> RepricingResult:
+    """
+    Reprice the requests with IDs in `[first_id, last_id]`, one chunk at a time.
+
+    Chunks are read by keyset on the ID and each chunk's changes are written
+    and committed together, so a failed run can be repeated: rows already
+    repriced no longer differ.
+    """
+    result = RepricingResult(first_id=first_id, last_id=last_id)
+    started = time.perf_counter()
+    reported = started
+
+    async with db.session_factory() as session:
+        await tariff_index.ensure_fresh(session, force=True)
+        result.tariff_version = tariff_index.version
+        await session.commit()
+
+        after_id = first_id - 1
+        while True:
+            rows = await get_insurance_requests_chunk(
+                session,
+                after_id=after_id,
+                last_id=last_id,
+                limit=options.chunk_size,
+                since=options.since,
+                until=options.until,
+                cargo_type=options.cargo_type,
+            )
+            if not rows:
+                break
+            after_id = rows[-1].id
+
+            changes, unpriced = reprice_rows(rows)
+            if not options.dry_run:
+                for i in range(0, len(changes), MAX_UPDATE_ROWS):
+                    await update_insurance_costs(
+                        session, changes[i : i + MAX_UPDATE_ROWS]
+                    )
+            await session.commit()
+
+            result.scanned += len(rows)
+            result.updated += len(changes)
+            result.unpriced += unpriced
+
+            now = time.perf_counter()
+            if now - reported >= settings.repricing_progress_interval:
+                reported = now
+                result.seconds = now - started
+                logger.info(
+                    f"Repricing IDs {first_id}-{last_id}: at {after_id}, "
+                    f"{result.scanned} scanned, {result.updated} changed, "
+                    f"{result.rows_per_second:.0f} rows/s."
+                )
+
+    result.seconds = time.perf_counter() - started
+    return result
+
+
+def _reprice_id_range_in_process(
+    first_id: int, last_id: int, options: RepricingOptions
+) -> RepricingResult:
+    async def run() -> RepricingResult:
+        try:
+            return await reprice_id_range(first_id, last_id, options)
+        finally:
+            # Pooled connections belong to this call's event loop.
+            await db.engine.dispose()
+
+    return asyncio.run(run())
+
+
+def split_id_range(
+    first_id: int, last_id: int, partitions: int
+) -> list[tuple[int, int]]:
+    """
+    Split `[first_id, last_id]` into at most `partitions` contiguous ranges.
+    """
+    size = -(-(last_id - first_id + 1) // max(partitions, 1))
+    return [
+        (start, min(start + size - 1, last_id))
+        for start in range(first_id, last_id + 1, size)
+    ]
+
+
+async def reprice_insurance_requests(
+    options: RepricingOptions,
+    partitions: int = settings.repricing_partitions,
+    workers: int = settings.repricing_workers,
+) -> RepricingResult:
+    """
+    Recompute `insurance_cost` of the matching requests from the current tariffs.
+
+    The ID range is split into `partitions` ranges that `workers` processes
+    reprice in parallel, each with its own connection pool and tariff index;
+    with a single worker the ranges are processed in this process.
+    """
+    async with db.session_factory() as session:
+        first_id, last_id = await get_insurance_id_bounds(
+            session, options.since, options.until, options.cargo_type
+        )
+    total = RepricingResult(first_id=first_id or 0, last_id=last_id or 0)
+    if first_id is None:
+        logger.info("Repricing: no matching insurance requests.")
+        return total
+
+    ranges = split_id_range(first_id, last_id, partitions)
+    started = time.perf_counter()
+    versions = set()
+
+    def add(result: RepricingResult, done: int):
+        total.scanned += result.scanned
+        total.updated += result.updated
+        total.unpriced += result.unpriced
+        total.seconds = time.perf_counter() - started
+        versions.add(result.tariff_version)
+        logger.info(
+            f"Repricing: {done}/{len(ranges)} ranges done, {total.scanned} scanned, "
+            f"{total.updated} changed, {total.rows_per_second:.0f} rows/s."
+        )
+
+    if workers <= 1:
+        for done, (first, last) in enumerate(ranges, start=1):
+            add(await reprice_id_range(first, last, options), done)
+    else:
+        loop = asyncio.get_running_loop()
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+        ) as pool:
+            futures = [
+                loop.run_in_executor(
+                    pool, _reprice_id_range_in_process, first, last, options
+                )
+                for first, last in ranges
+            ]
+            for done, future in enumerate(asyncio.as_completed(futures), start=1):
+                add(await future, done)
+
+    if len(versions) > 1:
+        logger.warning(
+            f"Tariffs changed while repricing (versions {sorted(versions)}); "
+            "run the job again to apply the latest rates everywhere."
+        )
+    total.tariff_version = max(versions)
+    logger.info(
+        f"Repricing {'dry run ' if options.dry_run else ''}finished: "
+        f"{total.scanned} scanned, {total.updated} changed, "
+        f"{total.unpriced} without a tariff in {total.seconds:.1f}s "
+        f"({total.rows_per_second:.0f} rows/s)."
+    )
+    return total
+
+
+def _init_worker():
+    from app.core.logging import setup_logging
+
+    setup_logging()
+
+
+def _parse_date(value: str) -> datetime:
+    return datetime.combine(date.fromisoformat(value), datetime.min.time())
+
+
+async def main(args: argparse.Namespace) -> RepricingResult:
+    """
+    Run a repricing job from the command line.
+    """
+    options = RepricingOptions(
+        since=args.since,
+        until=args.until,
+        cargo_type=args.cargo_type,
+        chunk_size=args.chunk_size,
+        dry_run=args.dry_run,
+    )
+    try:
+        return await reprice_insurance_requests(
+            options, partitions=args.partitions, workers=args.workers
+        )
+    finally:
+        await db.engine.dispose()
+
+
+if __name__ == "__main__":
+    import json
+
+    from app.core.logging import setup_logging
+
+    parser = argparse.ArgumentParser(
+        description="Recompute insurance_cost of stored insurance requests."
+    )
+    parser.add_argument("--since", type=_parse_date, help="first day, inclusive")
+    parser.add_argument("--until", type=_parse_date, help="last day, exclusive")
+    parser.add_argument("--cargo-type", type=CargoType)
+    parser.add_argument(
+        "--chunk-size", type=int, default=settings.repricing_chunk_size
+    )
+    parser.add_argument(
+        "--partitions", type=int, default=settings.repricing_partitions
+    )
+    parser.add_argument("--workers", type=int, default=settings.repricing_workers)
+    parser.add_argument("--dry-run", action="store_true")
+
+    setup_logging()
+    result = asyncio.run(main(parser.parse_args()))
+    print(
+        json.dumps(
+            {**asdict(result), "rows_per_second": round(result.rows_per_second, 1)}
+        )
+    )
@@ -1,46 +1,161 @@
 import logging
 from datetime import date, timedelta
-from typing import Dict, List
+from typing import AsyncIterator, Dict, List, Tuple
 
 from fastapi import HTTPException
-from sqlalchemy import and_, or_, select
+from pydantic import ValidationError
+from sqlalchemy import and_, column, insert, select, values
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.config import settings
 from app.models.tariff import CargoType, Tariff
-from app.schemas.tariff import TariffCreate, TariffJsonItem
-from .kafka import add_to_log_buffer
+from app.schemas.tariff import (
+    TariffCreate,
+    TariffImportChunkResult,
+    TariffJsonItem,
+    TariffNdjsonItem,
+)
+from .kafka import discard_pending_logs, publish_pending_logs, record_actions
+from .tariff_index import bump_tariff_version, tariff_index
 
 logger = logging.getLogger("tariff_service")
 
+DEFAULT_TARIFF_DURATION = timedelta(days=30)
 
-async def validate_tariff_dates(
+# SQLSTATE raised by Postgres when an exclusion constraint is violated.
+EXCLUSION_VIOLATION = "23P01"
+
+
+def overlap_error(cargo_type: CargoType, valid_from: date, valid_to: date) -> HTTPException:
+    return HTTPException(
+        status_code=400,
+        detail=(
+            f"A tariff for {cargo_type} already exists for the "
+            f"period {valid_from} to {valid_to}."
+        ),
+    )
+
+
+def validate_batch_dates(tariffs: List[TariffCreate]):
+    """
+    Validates that the tariffs of a batch do not overlap each other.
+    """
+    ordered = sorted(tariffs, key=lambda t: (t.cargo_type.value, t.valid_from))
+    for previous, current in zip(ordered, ordered[1:]):
+        if (
+            previous.cargo_type == current.cargo_type
+            and current.valid_from <= previous.valid_to
+        ):
+            raise overlap_error(
+                current.cargo_type, previous.valid_from, previous.valid_to
+            )
+
+
+def is_overlap_violation(error: IntegrityError) -> bool:
+    """
+    Tells whether an IntegrityError comes from the tariff period exclusion constraint.
+    """
+    return getattr(error.orig, "sqlstate", None) == EXCLUSION_VIOLATION
+
+
+async def find_overlapping_tariff(
     session: AsyncSession,
-    cargo_type: CargoType,
-    valid_from: date,
-    valid_to: date,
-):
+    periods: List[Tuple[CargoType, date, date]],
+    exclude_id: int | None = None,
+) -> Tariff | None:
     """
-    Validates that the date range does not overlap with existing tariffs for the same cargo type.
+    Finds a stored tariff overlapping any of the given periods with a single query.
     """
-    overlapping_tariff_query = select(Tariff).where(
-        Tariff.cargo_type == cargo_type,
-        or_(
-            and_(Tariff.valid_from <= valid_to, Tariff.valid_to >= valid_from),
-            and_(Tariff.valid_to >= valid_from, Tariff.valid_from <= valid_to),
-        ),
+    candidates = values(
+        column("cargo_type", Tariff.__table__.c.cargo_type.type),
+        column("valid_from", Tariff.__table__.c.valid_from.type),
+        column("valid_to", Tariff.__table__.c.valid_to.type),
+        name="candidates",
+    ).data(periods)
+
+    overlapping_tariff_query = (
+        select(Tariff)
+        .join(
+            candidates,
+            and_(
+                Tariff.cargo_type == candidates.c.cargo_type,
+                Tariff.valid_from <= candidates.c.valid_to,
+                Tariff.valid_to >= candidates.c.valid_from,
+            ),
+        )
+        .limit(1)
     )
+    if exclude_id is not None:
+        overlapping_tariff_query = overlapping_tariff_query.where(
+            Tariff.id != exclude_id
+        )
     result = await session.execute(overlapping_tariff_query)
-    overlapping_tariff = result.scalars().first()
+    return result.scalars().first()
+
+
+async def overlap_violation_error(
+    session: AsyncSession,
+    periods: List[Tuple[CargoType, date, date]],
+    exclude_id: int | None = None,
+) -> HTTPException:
+    """
+    Builds the overlap error for a write rejected by the exclusion constraint.
+
+    Must be called once the failed transaction has been rolled back; the
+    conflicting tariff is only looked up here, on the error path, so that
+    successful writes never pay for the query.
+    """
+    try:
+        overlapping_tariff = await find_overlapping_tariff(
+            session, periods, exclude_id
+        )
+    finally:
+        await session.rollback()
 
     if overlapping_tariff:
-        raise HTTPException(
-            status_code=400,
-            detail=(
-                f"A tariff for {cargo_type} already exists for the "
-                f"period {overlapping_tariff.valid_from} to {overlapping_tariff.valid_to}."
-            ),
+        return overlap_error(
+            overlapping_tariff.cargo_type,
+            overlapping_tariff.valid_from,
+            overlapping_tariff.valid_to,
         )
+    return overlap_error(*periods[0])
+
+
+def tariff_periods(tariffs: List[TariffCreate]) -> List[Tuple[CargoType, date, date]]:
+    return [(t.cargo_type, t.valid_from, t.valid_to) for t in tariffs]
+
+
+async def insert_tariff_batch(
+    session: AsyncSession, tariffs: List[TariffCreate]
+) -> List[Tariff]:
+    """
+    Validates and inserts a batch of tariffs with a single multi-row INSERT.
+
+    Overlaps with stored tariffs are rejected by the exclusion constraint.
+    The caller owns the transaction, translates such violations and publishes
+    the recorded log entries once it has been committed.
+    """
+    validate_batch_dates(tariffs)
+
+    result = await session.scalars(
+        insert(Tariff)
+        .values([tariff.model_dump() for tariff in tariffs])
+        .returning(Tariff)
+    )
+    inserted = list(result.all())
+    await record_actions(
+        session,
+        topic=settings.kafka_topic_tariffs,
+        action="LOAD_TARIFF",
+        entries=[(tariff.creation_details(), None) for tariff in inserted],
+    )
+    await bump_tariff_version(session, upserts=inserted)
+    return inserted
+
+
+def chunked(items: list, size: int) -> List[list]:
+    return [items[i : i + size] for i in range(0, len(items), size)]
 
 
 async def load_tariffs_from_json(
@@ -50,50 +165,156 @@ async def load_tariffs_from_json(
     """
     Load tariffs from a JSON-like structure and save them to the database.
     """
-    async with session.begin():  # Начинаем транзакцию
-        for valid_from, tariffs in tariffs_data.items():
-            if not isinstance(valid_from, date):
-                raise TypeError(
-                    f"Expected 'date' for valid_from, got {type(valid_from).__name__}"
-                )
+    tariffs = []
+    for valid_from, items in tariffs_data.items():
+        if not isinstance(valid_from, date):
+            raise TypeError(
+                f"Expected 'date' for valid_from, got {type(valid_from).__name__}"
+            )
 
-            valid_to = valid_from + timedelta(days=30)
+        valid_to = valid_from + DEFAULT_TARIFF_DURATION
+        tariffs.extend(
+            TariffCreate(
+                cargo_type=CargoType(item.cargo_type),
+                rate=item.rate,
+                valid_from=valid_from,
+                valid_to=valid_to,
+            )
+            for item in items
+        )
 
-            for tariff in tariffs:
-                tariff_data = TariffCreate(
-                    cargo_type=CargoType(tariff.cargo_type),
-                    rate=tariff.rate,
-                    valid_from=valid_from,
-                    valid_to=valid_to,
-                )
+    if not tariffs:
+        return
 
-                await validate_tariff_dates(
-                    session=session,
-                    cargo_type=tariff_data.cargo_type,
-                    valid_from=tariff_data.valid_from,
-                    valid_to=tariff_data.valid_to,
-                )
+    # Validate the whole load up front so overlaps across chunks are caught too.
+    validate_batch_dates(tariffs)
+
+    try:
+        async with session.begin():
+            for chunk in chunked(tariffs, settings.tariff_import_chunk_size):
+                await insert_tariff_batch(session, chunk)
+    except IntegrityError as e:
+        discard_pending_logs(session)
+        if is_overlap_violation(e):
+            raise await overlap_violation_error(session, tariff_periods(tariffs))
+        raise
+    except Exception:
+        discard_pending_logs(session)
+        raise
+
+    tariff_index.invalidate()
+    await publish_pending_logs(session)
+    logger.info(f"Successfully loaded tariffs: {len(tariffs_data)} entries.")
+
+
+async def iter_ndjson_lines(
+    stream: AsyncIterator[bytes],
+) -> AsyncIterator[tuple[int, bytes]]:
+    """
+    Split a byte stream into numbered, non-empty NDJSON lines.
+    """
+    buffer = b""
+    line_number = 0
+    async for data in stream:
+        buffer += data
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            line_number += 1
+            if line.strip():
+                yield line_number, line
+
+    if buffer.strip():
+        yield line_number + 1, buffer
+
+
+def parse_ndjson_tariff(line: bytes) -> TariffCreate:
+    item = TariffNdjsonItem.model_validate_json(line)
+    return TariffCreate(
+        cargo_type=CargoType(item.cargo_type),
+        rate=item.rate,
+        valid_from=item.valid_from,
+        valid_to=item.valid_to or item.valid_from + DEFAULT_TARIFF_DURATION,
+    )
 
-                new_tariff = Tariff(
-                    cargo_type=tariff_data.cargo_type,
-                    rate=tariff_data.rate,
-                    valid_from=tariff_data.valid_from,
-                    valid_to=tariff_data.valid_to,
+
+async def import_tariff_chunk(
+    session: AsyncSession,
+    number: int,
+    tariffs: List[TariffCreate],
+    received: int,
+    error: str | None,
+) -> TariffImportChunkResult:
+    """
+    Insert one chunk of a streamed import in its own transaction.
+    """
+    if error is None:
+        try:
+            async with session.begin():
+                inserted = await insert_tariff_batch(session, tariffs)
+        except HTTPException as e:
+            discard_pending_logs(session)
+            error = e.detail
+        except IntegrityError as e:
+            discard_pending_logs(session)
+            if not is_overlap_violation(e):
+                raise
+            error = (
+                await overlap_violation_error(session, tariff_periods(tariffs))
+            ).detail
+        else:
+            tariff_index.invalidate()
+            await publish_pending_logs(session)
+            return TariffImportChunkResult(
+                chunk=number,
+                received=received,
+                inserted=len(inserted),
+                status="success",
+            )
+
+    logger.warning(f"Tariff import chunk {number} rejected: {error}")
+    return TariffImportChunkResult(
+        chunk=number, received=received, inserted=0, status="error", detail=error
+    )
+
+
+async def import_tariffs_from_ndjson(
+    session: AsyncSession,
+    stream: AsyncIterator[bytes],
+    chunk_size: int | None = None,
+) -> List[TariffImportChunkResult]:
+    """
+    Import tariffs from an NDJSON byte stream, one line per tariff.
+
+    Lines are parsed as they arrive and committed in chunks of `chunk_size`;
+    a chunk with an invalid line or an overlapping period is rejected as a
+    whole while the remaining chunks are still imported.
+    """
+    chunk_size = chunk_size or settings.tariff_import_chunk_size
+    results = []
+    tariffs: List[TariffCreate] = []
+    received = 0
+    error = None
+
+    async for line_number, line in iter_ndjson_lines(stream):
+        received += 1
+        try:
+            tariffs.append(parse_ndjson_tariff(line))
+        except (ValidationError, ValueError) as e:
+            error = error or f"Line {line_number}: {e}"
+
+        if received == chunk_size:
+            results.append(
+                await import_tariff_chunk(
+                    session, len(results) + 1, tariffs, received, error
                 )
-                session.add(new_tariff)
-
-                try:
-                    await add_to_log_buffer(
-                        session=session,
-                        topic=settings.kafka_topic_tariffs,
-                        action="LOAD_TARIFF",
-                        details=tariff_data.dict(),
-                        user_id=None,
-                    )
-                except Exception as e:
-                    logger.error(f"Failed to log tariff load event: {e}")
-                    raise HTTPException(
-                        status_code=500, detail="Failed to log tariff event to Kafka."
-                    )
-
-        logger.info(f"Successfully loaded tariffs: {len(tariffs_data)} entries.")
+            )
+            tariffs, received, error = [], 0, None
+
+    if received:
+        results.append(
+            await import_tariff_chunk(
+                session, len(results) + 1, tariffs, received, error
+            )
+        )
+
+    return results
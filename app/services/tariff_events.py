@@ -0,0 +1,115 @@
+import asyncio
+import json
+import logging
+from typing import Optional
+
+import asyncpg
+
+from app.core.cache import tariff_response_cache
+from app.core.config import settings
+from .tariff_index import tariff_index
+
+logger = logging.getLogger("app")
+
+
+def apply_tariff_notification(payload: str):
+    """
+    Apply a change announced by `bump_tariff_version` to this worker's state.
+    """
+    change = json.loads(payload)
+    tariff_response_cache.clear()
+    if change.get("reload"):
+        tariff_index.announced_version = max(
+            tariff_index.announced_version, change["version"]
+        )
+        if tariff_index.version is None or tariff_index.version < change["version"]:
+            tariff_index.invalidate()
+        return
+
+    tariff_index.apply_changes(
+        change["version"],
+        upserts=change["upserts"],
+        deleted_ids=change["deleted"],
+    )
+
+
+class TariffChangeListener:
+    """
+    Background task listening for tariff change notifications.
+
+    It holds a dedicated asyncpg connection outside the pool. While connected,
+    the tariff index relies on the notifications instead of polling the
+    version counter; after a (re)connect the counter is checked once, since
+    notifications sent while disconnected are lost.
+    """
+
+    def __init__(self, channel: str, retry_interval: float):
+        self.channel = channel
+        self.retry_interval = retry_interval
+        self._task: Optional[asyncio.Task] = None
+        self._stop_event = asyncio.Event()
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._stop_event.clear()
+            self._task = asyncio.create_task(self.run())
+            logger.info("Tariff change listener started.")
+
+    async def stop(self):
+        if self._task is None:
+            return
+
+        self._stop_event.set()
+        await self._task
+        self._task = None
+        logger.info("Tariff change listener stopped.")
+
+    def _on_notification(self, connection, pid, channel, payload):
+        try:
+            apply_tariff_notification(payload)
+        except Exception as e:
+            logger.error(f"Failed to apply tariff notification: {e}", exc_info=True)
+            tariff_index.invalidate()
+
+    async def _listen_once(self):
+        connection = await asyncpg.connect(settings.db_dsn)
+        lost = asyncio.Event()
+        connection.add_termination_listener(lambda _: lost.set())
+        try:
+            await connection.add_listener(self.channel, self._on_notification)
+            tariff_response_cache.clear()
+            if settings.tariff_index_enabled:
+                await tariff_index.preload(force=True)
+            tariff_index.listening = True
+            logger.info(f"Listening for tariff changes on '{self.channel}'.")
+
+            stop = asyncio.create_task(self._stop_event.wait())
+            closed = asyncio.create_task(lost.wait())
+            await asyncio.wait({stop, closed}, return_when=asyncio.FIRST_COMPLETED)
+            stop.cancel()
+            closed.cancel()
+        finally:
+            tariff_index.listening = False
+            if not connection.is_closed():
+                await connection.close()
+
+    async def run(self):
+        while not self._stop_event.is_set():
+            try:
+                await self._listen_once()
+            except Exception as e:
+                logger.error(f"Tariff change listener failed: {e}")
+
+            if not self._stop_event.is_set():
+                try:
+                    await asyncio.wait_for(
+                        self._stop_event.wait(), self.retry_interval
+                    )
+                except asyncio.TimeoutError:
+                    pass
+
+
+tariff_listener = TariffChangeListener(
+    channel=settings.tariff_listener_channel,
+    retry_interval=settings.tariff_listener_retry_interval,
+)
@@ -0,0 +1,450 @@
+import asyncio
+import json
+import logging
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import date, timedelta
+from itertools import accumulate
+from typing import Iterable, Sequence
+
+from sqlalchemy import Text, cast, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db.database import db
+from app.models.tariff import CargoType, Tariff, TariffVersion
+from app.schemas.tariff import TariffResponse
+
+logger = logging.getLogger("app")
+
+TARIFF_VERSION_ID = 1
+
+# Postgres rejects NOTIFY payloads of 8000 bytes or more.
+MAX_NOTIFY_PAYLOAD_BYTES = 7900
+
+
+class CargoTariffIntervals:
+    """
+    Sorted interval index over the tariffs of a single cargo type.
+    """
+
+    def __init__(self, tariffs: list[TariffResponse]):
+        self.by_start = sorted(tariffs, key=lambda t: (t.valid_from, t.id))
+        self.starts = [t.valid_from for t in self.by_start]
+        self.max_ends = list(accumulate((t.valid_to for t in self.by_start), max))
+        self.by_end = sorted(tariffs, key=lambda t: (t.valid_to, t.id))
+        self.ends = [t.valid_to for t in self.by_end]
+
+    def current(self, calc_date: date) -> TariffResponse | None:
+        """
+        Return the latest-starting tariff covering `calc_date`.
+
+        Tariffs of one cargo type do not overlap, so the first candidate left of
+        the bisection point is the answer; the running maximum of `valid_to`
+        stops the walk early if overlapping rows were ever written.
+        """
+        i = bisect_right(self.starts, calc_date) - 1
+        while i >= 0 and self.max_ends[i] >= calc_date:
+            if self.by_start[i].valid_to >= calc_date:
+                return self.by_start[i]
+            i -= 1
+        return None
+
+    def nearest_future(self, calc_date: date) -> TariffResponse | None:
+        i = bisect_right(self.starts, calc_date)
+        return self.by_start[i] if i < len(self.by_start) else None
+
+    def nearest_past(self, calc_date: date) -> TariffResponse | None:
+        i = bisect_left(self.ends, calc_date) - 1
+        return self.by_end[i] if i >= 0 else None
+
+    def resolve(self, calc_date: date) -> TariffResponse | None:
+        """
+        Return the current tariff, falling back to the nearest future or past one.
+        """
+        tariff = self.current(calc_date)
+        if tariff:
+            return tariff
+
+        future_tariff = self.nearest_future(calc_date)
+        past_tariff = self.nearest_past(calc_date)
+
+        if future_tariff and past_tariff:
+            delta_future = (future_tariff.valid_from - calc_date).days
+            delta_past = (calc_date - past_tariff.valid_to).days
+            return future_tariff if delta_future < delta_past else past_tariff
+        return future_tariff or past_tariff
+
+    def affected_days(self, tariff: TariffResponse) -> tuple[date | None, date | None]:
+        """
+        Bounds of the dates whose resolution can depend on `tariff`.
+
+        Outside the gap between the neighbouring tariffs the current one wins,
+        and the nearest tariff never lies beyond a neighbour, so adding or
+        removing `tariff` only changes the dates strictly between them. A
+        missing neighbour leaves that side unbounded (None).
+        """
+        i = bisect_left(self.ends, tariff.valid_from) - 1
+        j = bisect_right(self.starts, tariff.valid_to)
+        first = self.ends[i] + timedelta(days=1) if i >= 0 else None
+        last = self.starts[j] - timedelta(days=1) if j < len(self.starts) else None
+        return first, last
+
+
+class CargoTariffTimeline:
+    """
+    Day-indexed snapshot of the tariff resolved for every date of a horizon.
+
+    Position `i` holds the id and rate of the tariff `CargoTariffIntervals`
+    resolves for `start + i` days (id 0 when there is none), so a lookup is a
+    subtraction and an array read, and many dates can be priced in one pass.
+    """
+
+    def __init__(self, start: date, days: int):
+        self.start = start
+        self.days = days
+        self.tariff_ids = array("q", bytes(8 * days))
+        self.rates = array("d", bytes(8 * days))
+
+    @property
+    def end(self) -> date:
+        return self.start + timedelta(days=self.days - 1)
+
+    def offset(self, calc_date: date) -> int | None:
+        i = (calc_date - self.start).days
+        return i if 0 <= i < self.days else None
+
+    def fill(
+        self,
+        intervals: CargoTariffIntervals,
+        first: date | None = None,
+        last: date | None = None,
+    ) -> int:
+        """
+        Recompute the days between `first` and `last` (inclusive, clipped to the
+        horizon) and return how many were written.
+
+        Days resolving to the same tariff form runs whose end follows from the
+        neighbouring tariffs, so each run is resolved once and written as a
+        slice.
+        """
+        lo = 0 if first is None else max((first - self.start).days, 0)
+        hi = self.days - 1
+        if last is not None:
+            hi = min((last - self.start).days, hi)
+        i = lo
+        while i <= hi:
+            day = self.start + timedelta(days=i)
+            tariff = intervals.resolve(day)
+            run_end = self._run_end(intervals, tariff, day)
+            n = min((run_end - day).days, hi - i) + 1 if run_end else hi - i + 1
+            self.tariff_ids[i : i + n] = array("q", [tariff.id if tariff else 0]) * n
+            self.rates[i : i + n] = array("d", [tariff.rate if tariff else 0.0]) * n
+            i += n
+        return max(hi - lo + 1, 0)
+
+    @staticmethod
+    def _run_end(
+        intervals: CargoTariffIntervals, tariff: TariffResponse | None, day: date
+    ) -> date | None:
+        """
+        Last day that resolves like `day`, or None if every later day does.
+        """
+        if tariff is None:
+            return None
+        if tariff.valid_from > day:
+            # Approaching the nearest future tariff only brings it closer.
+            return tariff.valid_from - timedelta(days=1)
+
+        j = bisect_right(intervals.starts, day)
+        next_start = intervals.starts[j] if j < len(intervals.starts) else None
+        if tariff.valid_to >= day:
+            if next_start is None:
+                return tariff.valid_to
+            return min(tariff.valid_to, next_start - timedelta(days=1))
+        if next_start is None:
+            return None
+        # In a gap the past tariff wins while it is at least as close.
+        return tariff.valid_to + timedelta(days=(next_start - tariff.valid_to).days // 2)
+
+    def tariff_id(self, calc_date: date) -> int | None:
+        """
+        Id of the tariff for `calc_date`: 0 if there is none, None outside the
+        horizon.
+        """
+        i = self.offset(calc_date)
+        return self.tariff_ids[i] if i is not None else None
+
+
+class TariffIndex:
+    """
+    Per-process index of all tariffs, grouped by cargo type.
+
+    The index is tagged with the `tariff_versions` counter it was built from.
+    Lookups re-read the counter at most every `tariff_index_check_interval`
+    seconds and reload when another worker has changed the tariffs, unless
+    `listening` is set: then the change listener applies every committed
+    change as it is announced and no polling is needed.
+    """
+
+    def __init__(self):
+        self.version: int | None = None
+        self._tariffs: dict[int, TariffResponse] = {}
+        self._intervals: dict[CargoType, CargoTariffIntervals] = {}
+        self._timelines: dict[CargoType, CargoTariffTimeline] = {}
+        self._checked_at = 0.0
+        self._lock = asyncio.Lock()
+        self.listening = False
+        self.announced_version = 0
+
+    def _is_fresh(self) -> bool:
+        if self.version is None:
+            return False
+        if self.listening:
+            # Notifications keep the index current; it is only behind when one
+            # was announced while a reload was in progress.
+            return self.version >= self.announced_version
+        return (
+            time.monotonic() - self._checked_at < settings.tariff_index_check_interval
+        )
+
+    async def ensure_fresh(self, session: AsyncSession, force: bool = False) -> None:
+        """
+        Reload the index if it is empty, invalidated or behind the database.
+
+        With `force`, the database counter is checked even if the index looks
+        fresh.
+        """
+        if not force and self._is_fresh():
+            return
+
+        async with self._lock:
+            if not force and self._is_fresh():
+                return
+
+            version = await get_tariff_version(session)
+            if version != self.version:
+                await self._load(session, version)
+            self._checked_at = time.monotonic()
+
+    async def preload(self, force: bool = False) -> None:
+        """
+        Load the index on its own session, e.g. during application startup.
+        """
+        async with db.session_factory() as session:
+            await self.ensure_fresh(session, force=force)
+
+    async def _load(self, session: AsyncSession, version: int) -> None:
+        # The version is read before the rows, so a concurrent change can only
+        # make the snapshot newer than its tag and trigger one extra reload.
+        result = await session.execute(select(Tariff))
+        self._tariffs = {
+            tariff.id: TariffResponse.model_validate(tariff)
+            for tariff in result.scalars()
+        }
+        self._intervals = {
+            cargo_type: CargoTariffIntervals(self._tariffs_of(cargo_type))
+            for cargo_type in CargoType
+        }
+        self._timelines = self._build_timelines()
+        self.version = version
+        logger.info(f"Tariff index loaded: {len(self._tariffs)} tariffs, version {version}.")
+
+    def _tariffs_of(self, cargo_type: CargoType) -> list[TariffResponse]:
+        return [t for t in self._tariffs.values() if t.cargo_type == cargo_type]
+
+    def _build_timelines(self) -> dict[CargoType, CargoTariffTimeline]:
+        if not settings.tariff_timeline_enabled:
+            return {}
+        start = date.today() - timedelta(days=settings.tariff_timeline_past_days)
+        days = (
+            settings.tariff_timeline_past_days
+            + settings.tariff_timeline_future_days
+            + 1
+        )
+        timelines = {}
+        for cargo_type, intervals in self._intervals.items():
+            timeline = CargoTariffTimeline(start, days)
+            timeline.fill(intervals)
+            timelines[cargo_type] = timeline
+        return timelines
+
+    def resolve(self, cargo_type: CargoType, calc_date: date) -> TariffResponse | None:
+        timeline = self._timelines.get(cargo_type)
+        if timeline is not None:
+            tariff_id = timeline.tariff_id(calc_date)
+            if tariff_id is not None:
+                return self._tariffs.get(tariff_id)
+
+        intervals = self._intervals.get(cargo_type)
+        return intervals.resolve(calc_date) if intervals else None
+
+    def resolve_many(
+        self, cargo_type: CargoType, dates: Iterable[date]
+    ) -> list[TariffResponse | None]:
+        """
+        Resolve a tariff for each of `dates`, in order.
+        """
+        timeline = self._timelines.get(cargo_type)
+        intervals = self._intervals.get(cargo_type)
+        if intervals is None:
+            return [None for _ in dates]
+        if timeline is None:
+            return [intervals.resolve(calc_date) for calc_date in dates]
+
+        tariffs, ids, start = self._tariffs, timeline.tariff_ids, timeline.start
+        resolved = []
+        for calc_date in dates:
+            i = (calc_date - start).days
+            if 0 <= i < timeline.days:
+                resolved.append(tariffs.get(ids[i]))
+            else:
+                resolved.append(intervals.resolve(calc_date))
+        return resolved
+
+    def apply_change(
+        self,
+        version: int,
+        upsert: Tariff | TariffResponse | None = None,
+        deleted: Tariff | None = None,
+    ) -> None:
+        """
+        Apply a committed change of a single tariff; see `apply_changes`.
+        """
+        self.apply_changes(
+            version,
+            upserts=[upsert] if upsert is not None else [],
+            deleted_ids=[deleted.id] if deleted is not None else [],
+        )
+
+    def apply_changes(
+        self,
+        version: int,
+        upserts: list[Tariff | TariffResponse | dict],
+        deleted_ids: list[int],
+    ) -> None:
+        """
+        Apply a committed tariff change that moved the counter to `version`.
+
+        The change is applied in place only if the index is exactly one version
+        behind; otherwise another writer got in between and the index is
+        invalidated instead.
+        """
+        self.announced_version = max(self.announced_version, version)
+        if self.version is not None and self.version >= version:
+            return
+        if self.version != version - 1:
+            self.invalidate()
+            return
+
+        # Old versions are located with the intervals they were part of, new
+        # ones with the rebuilt intervals; only those ranges of the timelines
+        # are recomputed.
+        removed: list[TariffResponse] = []
+        added: list[TariffResponse] = []
+        for tariff_id in deleted_ids:
+            previous = self._tariffs.pop(tariff_id, None)
+            if previous:
+                removed.append(previous)
+        for upsert in upserts:
+            tariff = TariffResponse.model_validate(upsert)
+            previous = self._tariffs.get(tariff.id)
+            if previous:
+                removed.append(previous)
+            self._tariffs[tariff.id] = tariff
+            added.append(tariff)
+
+        ranges: dict[CargoType, list[tuple[date | None, date | None]]] = {}
+        for tariff in removed:
+            ranges.setdefault(tariff.cargo_type, []).append(
+                self._intervals[tariff.cargo_type].affected_days(tariff)
+            )
+        for cargo_type in {t.cargo_type for t in removed + added}:
+            self._intervals[cargo_type] = CargoTariffIntervals(
+                self._tariffs_of(cargo_type)
+            )
+        for tariff in added:
+            ranges.setdefault(tariff.cargo_type, []).append(
+                self._intervals[tariff.cargo_type].affected_days(tariff)
+            )
+
+        for cargo_type, cargo_ranges in ranges.items():
+            timeline = self._timelines.get(cargo_type)
+            if timeline is not None:
+                for first, last in cargo_ranges:
+                    timeline.fill(self._intervals[cargo_type], first, last)
+        self.version = version
+
+    def invalidate(self) -> None:
+        """
+        Drop the index so the next lookup reloads it from the database.
+        """
+        self.version = None
+
+
+async def get_tariff_version(session: AsyncSession) -> int:
+    result = await session.execute(
+        select(TariffVersion.version).where(TariffVersion.id == TARIFF_VERSION_ID)
+    )
+    return result.scalar_one()
+
+
+def tariff_change_payload(
+    upserts: list[Tariff], deleted_ids: list[int]
+) -> str | None:
+    """
+    JSON body of a tariff change notification, without its leading version.
+
+    Returns None when the change is too large for a NOTIFY payload, in which
+    case listeners are told to reload instead.
+    """
+    body = json.dumps(
+        {
+            "upserts": [
+                TariffResponse.model_validate(tariff).model_dump(mode="json")
+                for tariff in upserts
+            ],
+            "deleted": deleted_ids,
+        },
+        separators=(",", ":"),
+    )
+    if len(body.encode("utf-8")) > MAX_NOTIFY_PAYLOAD_BYTES:
+        return None
+    return body[1:]
+
+
+async def bump_tariff_version(
+    session: AsyncSession,
+    upserts: Sequence[Tariff] = (),
+    deleted_ids: Sequence[int] = (),
+) -> int:
+    """
+    Increment the tariff version inside the caller's transaction.
+
+    When the change listener is enabled, the same statement also queues a
+    NOTIFY describing the change, which Postgres delivers to every worker
+    once the transaction commits.
+    """
+    returning = [TariffVersion.version]
+    if settings.tariff_listener_enabled:
+        body = tariff_change_payload(list(upserts), list(deleted_ids))
+        suffix = f",{body}" if body is not None else ',"reload":true}'
+        returning.append(
+            func.pg_notify(
+                settings.tariff_listener_channel,
+                '{"version":' + cast(TariffVersion.version, Text) + suffix,
+            )
+        )
+
+    stmt = (
+        update(TariffVersion)
+        .where(TariffVersion.id == TARIFF_VERSION_ID)
+        .values(version=TariffVersion.version + 1)
+        .returning(*returning)
+    )
+    result = await session.execute(stmt)
+    return result.scalars().first()
+
+
+tariff_index = TariffIndex()
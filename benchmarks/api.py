@@ -0,0 +1,289 @@
+"""
+Benchmark the insurance and tariff APIs in-process against a local Postgres.
+
+The application is driven through its ASGI interface with the lifespan
+running, while Kafka is replaced by an in-memory producer. The suite adds
+tariffs, insurance requests and action logs it never removes, so it refuses
+to run unless BENCH_POSTGRES_DB names a dedicated, migrated database; the
+other POSTGRES_* settings are read as usual. Results are written as JSON,
+and `--baseline` compares them with an earlier run, failing when throughput
+drops by more than `--max-regression`.
+
+    POSTGRES_DB=insurance_bench alembic upgrade head
+    BENCH_POSTGRES_DB=insurance_bench python -m benchmarks.api --output results.json
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+BENCH_DATABASE = os.environ.get("BENCH_POSTGRES_DB")
+if BENCH_DATABASE:
+    os.environ["POSTGRES_DB"] = BENCH_DATABASE
+
+from sqlalchemy import func, select  # noqa: E402
+
+from app.core import kafka  # noqa: E402
+from app.core.cache import tariff_response_cache  # noqa: E402
+from app.core.config import settings  # noqa: E402
+from app.db.database import db  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models.tariff import CargoType, Tariff  # noqa: E402
+from app.services.kafka import flush_logs_to_kafka  # noqa: E402
+
+# Imported after the application settings are loaded: the module sets
+# placeholder POSTGRES_* variables for its own standalone runs.
+from benchmarks.asgi import ASGIClient  # noqa: E402
+from benchmarks.kafka_producer import InMemoryBroker, make_messages  # noqa: E402
+
+API = settings.api_prefix
+
+
+def summarize(name: str, latencies: list[float], elapsed: float, **extra) -> dict:
+    latencies = sorted(latencies)
+    return {
+        "scenario": name,
+        "operations": len(latencies),
+        "seconds": round(elapsed, 4),
+        "throughput": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 3),
+        "p99_ms": round(latencies[int((len(latencies) - 1) * 0.99)] * 1000, 3),
+        **extra,
+    }
+
+
+async def run_concurrently(
+    operation, count: int, concurrency: int
+) -> tuple[list[float], float]:
+    """
+    Run `operation(i)` `count` times with at most `concurrency` in flight.
+    """
+    latencies: list[float] = []
+    counter = iter(range(count))
+
+    async def worker():
+        for i in counter:
+            start = time.perf_counter()
+            await operation(i)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, time.perf_counter() - start
+
+
+def expect(response, status: int = 200):
+    if response.status != status:
+        raise RuntimeError(f"Unexpected {response.status}: {response.body[:500]!r}")
+
+
+async def first_free_date() -> date:
+    async with db.session_factory() as session:
+        latest = await session.scalar(select(func.max(Tariff.valid_to)))
+    return (latest or date.today()) + timedelta(days=1)
+
+
+async def bench_load_tariffs(client: ASGIClient, args) -> dict:
+    """
+    Sequential bulk loads, each covering `--load-dates` consecutive periods.
+    """
+    period = timedelta(days=31)
+    start_date = await first_free_date()
+
+    async def load(i: int):
+        first = start_date + period * (i * args.load_dates)
+        payload = {
+            "tariffs": {
+                (first + period * d).isoformat(): [
+                    {"cargo_type": cargo_type.value, "rate": 0.01 + 0.01 * n}
+                    for n, cargo_type in enumerate(CargoType)
+                ]
+                for d in range(args.load_dates)
+            }
+        }
+        expect(
+            await client.request(
+                "POST", f"{API}/tariffs/load-tariffs/", json_body=payload
+            )
+        )
+
+    latencies, elapsed = await run_concurrently(load, args.load_requests, 1)
+    return summarize(
+        "POST /tariffs/load-tariffs/",
+        latencies,
+        elapsed,
+        tariffs_per_request=args.load_dates * len(CargoType),
+    )
+
+
+async def bench_insurance(client: ASGIClient, args) -> dict:
+    cargo_types = list(CargoType)
+
+    async def calculate(i: int):
+        payload = {
+            "cargo_type": cargo_types[i % len(cargo_types)].value,
+            "declared_value": 1000 + i,
+            "user_id": i % 100,
+        }
+        expect(await client.request("POST", f"{API}/insurance/", json_body=payload))
+
+    latencies, elapsed = await run_concurrently(
+        calculate, args.requests, args.concurrency
+    )
+    return summarize(
+        "POST /insurance/", latencies, elapsed, concurrency=args.concurrency
+    )
+
+
+async def bench_list_tariffs(client: ASGIClient, args, cached: bool) -> dict:
+    tariff_response_cache.clear()
+    tariff_response_cache.enabled = cached
+
+    async def list_page(i: int):
+        expect(await client.request("GET", f"{API}/tariffs/", params={"limit": 100}))
+
+    try:
+        latencies, elapsed = await run_concurrently(
+            list_page, args.requests, args.concurrency
+        )
+    finally:
+        tariff_response_cache.enabled = settings.tariff_cache_enabled
+    name = "GET /tariffs/ (cached)" if cached else "GET /tariffs/ (uncached)"
+    return summarize(name, latencies, elapsed, concurrency=args.concurrency)
+
+
+async def bench_log_flush(args, batch_size: int) -> dict:
+    timestamp = datetime.utcnow().isoformat()
+    batches = [
+        [
+            {"topic": topic, "message": {**message, "timestamp": timestamp}}
+            for topic, message in make_messages(batch_size)
+        ]
+        for _ in range(args.flush_batches)
+    ]
+
+    async def flush(i: int):
+        if not await flush_logs_to_kafka(batches[i]):
+            raise RuntimeError("Log flush failed")
+
+    latencies, elapsed = await run_concurrently(flush, len(batches), 1)
+    return summarize(
+        f"log flush, batch={batch_size}",
+        latencies,
+        elapsed,
+        batch_size=batch_size,
+        events_per_second=round(batch_size * len(batches) / elapsed, 1),
+    )
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: list[dict], baseline_path: Path, max_regression: float) -> bool:
+    """
+    Print the throughput change per scenario; False if any regressed too far.
+    """
+    baseline = {
+        result["scenario"]: result
+        for result in json.loads(baseline_path.read_text())["results"]
+    }
+    ok = True
+    for result in results:
+        previous = baseline.get(result["scenario"])
+        if previous is None:
+            continue
+        change = result["throughput"] / previous["throughput"] - 1
+        regressed = change < -max_regression
+        ok = ok and not regressed
+        print(
+            f"{result['scenario']:<32} {previous['throughput']:>10.1f} -> "
+            f"{result['throughput']:>10.1f} ops/s ({change:+.1%})"
+            f"{'  REGRESSION' if regressed else ''}"
+        )
+    return ok
+
+
+async def main(args: argparse.Namespace) -> bool:
+    logging.getLogger("app").setLevel(logging.WARNING)
+    logging.getLogger("kafka").setLevel(logging.WARNING)
+
+    kafka.producer = InMemoryBroker(
+        round_trip=args.kafka_round_trip_ms / 1000, linger=0
+    )
+
+    results = []
+    async with ASGIClient(app) as client:
+        results.append(await bench_load_tariffs(client, args))
+        results.append(await bench_insurance(client, args))
+        results.append(await bench_list_tariffs(client, args, cached=False))
+        results.append(await bench_list_tariffs(client, args, cached=True))
+        for batch_size in args.flush_batch_sizes:
+            results.append(await bench_log_flush(args, batch_size))
+
+    for result in results:
+        print(
+            f"{result['scenario']:<32} {result['operations']:>7} ops "
+            f"{result['throughput']:>10.1f} ops/s "
+            f"p50 {result['p50_ms']:>8.3f}ms p99 {result['p99_ms']:>8.3f}ms"
+        )
+
+    report = {
+        "version": settings.version,
+        "commit": git_commit(),
+        "created_at": datetime.utcnow().isoformat(),
+        "python": platform.python_version(),
+        "parameters": {
+            key: value
+            for key, value in vars(args).items()
+            if key not in ("output", "baseline")
+        },
+        "results": results,
+    }
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2))
+        print(f"Results written to {args.output}")
+
+    if args.baseline:
+        return compare(results, args.baseline, args.max_regression)
+    return True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--load-requests", type=int, default=20)
+    parser.add_argument("--load-dates", type=int, default=25)
+    parser.add_argument("--flush-batches", type=int, default=20)
+    parser.add_argument(
+        "--flush-batch-sizes", type=int, nargs="+", default=[10, 100, 1000]
+    )
+    parser.add_argument("--kafka-round-trip-ms", type=float, default=0.0)
+    parser.add_argument("--output", type=Path)
+    parser.add_argument("--baseline", type=Path)
+    parser.add_argument("--max-regression", type=float, default=0.10)
+    arguments = parser.parse_args()
+    if not BENCH_DATABASE:
+        parser.error(
+            "set BENCH_POSTGRES_DB to a dedicated, migrated database; "
+            "the suite writes rows it does not remove"
+        )
+    sys.exit(0 if asyncio.run(main(arguments)) else 1)
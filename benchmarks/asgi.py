@@ -0,0 +1,117 @@
+"""
+Minimal in-process ASGI client used by the benchmarks.
+
+Requests go straight into the application callable, without sockets or an
+HTTP client library, so the numbers only cover the application itself.
+"""
+
+import asyncio
+import json
+from typing import Any
+from urllib.parse import urlencode
+
+
+class ASGIResponse:
+    def __init__(self, status: int, headers: list[tuple[bytes, bytes]], body: bytes):
+        self.status = status
+        self.headers = {key.decode().lower(): value.decode() for key, value in headers}
+        self.body = body
+
+    def json(self) -> Any:
+        return json.loads(self.body)
+
+
+class ASGIClient:
+    """
+    Drives an ASGI application: runs its lifespan and sends HTTP requests.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._lifespan_task: asyncio.Task | None = None
+        self._lifespan_inbox: asyncio.Queue = asyncio.Queue()
+        self._lifespan_outbox: asyncio.Queue = asyncio.Queue()
+
+    async def __aenter__(self) -> "ASGIClient":
+        await self.startup()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.shutdown()
+
+    async def _lifespan_event(self, event: str):
+        await self._lifespan_inbox.put({"type": f"lifespan.{event}"})
+        message = await self._lifespan_outbox.get()
+        if message["type"] != f"lifespan.{event}.complete":
+            raise RuntimeError(f"Lifespan {event} failed: {message}")
+
+    async def startup(self):
+        scope = {"type": "lifespan", "asgi": {"version": "3.0"}, "state": {}}
+        self._lifespan_task = asyncio.create_task(
+            self.app(scope, self._lifespan_inbox.get, self._lifespan_outbox.put)
+        )
+        await self._lifespan_event("startup")
+
+    async def shutdown(self):
+        if self._lifespan_task is None:
+            return
+        await self._lifespan_event("shutdown")
+        await self._lifespan_task
+        self._lifespan_task = None
+
+    async def request(
+        self,
+        method: str,
+        path: str,
+        params: dict | None = None,
+        json_body: Any = None,
+        content: bytes = b"",
+        headers: dict | None = None,
+    ) -> ASGIResponse:
+        headers = {key.lower(): value for key, value in (headers or {}).items()}
+        if json_body is not None:
+            content = json.dumps(json_body).encode()
+            headers.setdefault("content-type", "application/json")
+        headers["content-length"] = str(len(content))
+
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": method,
+            "scheme": "http",
+            "path": path,
+            "raw_path": path.encode(),
+            "query_string": urlencode(params or {}, doseq=True).encode(),
+            "root_path": "",
+            "headers": [(k.encode(), v.encode()) for k, v in headers.items()],
+            "server": ("benchmark", 80),
+            "client": ("benchmark", 1),
+            "state": {},
+        }
+
+        request_sent = False
+        response_done = asyncio.Event()
+        status, response_headers, body = 500, [], bytearray()
+
+        async def receive():
+            nonlocal request_sent
+            if not request_sent:
+                request_sent = True
+                return {"type": "http.request", "body": content, "more_body": False}
+            await response_done.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            nonlocal status, response_headers
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                response_headers = message.get("headers", [])
+            elif message["type"] == "http.response.body":
+                body.extend(message.get("body", b""))
+                if not message.get("more_body", False):
+                    response_done.set()
+
+        await self.app(scope, receive, send)
+        response_done.set()
+        return ASGIResponse(status, response_headers, bytes(body))
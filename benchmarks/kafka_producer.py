@@ -0,0 +1,149 @@
+"""
+Compare per-message `produce_message` with batched `produce_messages`.
+
+Both paths run against an in-memory stand-in broker that charges one network
+round trip per request, so the numbers show how many round trips each path
+needs rather than real broker throughput.
+
+    python -m benchmarks.kafka_producer --messages 2000 --round-trip-ms 1
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import time
+from collections import defaultdict
+
+for name, value in {
+    "POSTGRES_USER": "bench",
+    "POSTGRES_PASSWORD": "bench",
+    "POSTGRES_DB": "bench",
+    "POSTGRES_HOST": "localhost",
+    "POSTGRES_PORT": "5432",
+}.items():
+    os.environ.setdefault(name, value)
+
+from app.core import kafka  # noqa: E402
+
+
+class InMemoryBroker:
+    """
+    Producer stand-in with aiokafka's `send`/`send_and_wait` interface.
+
+    `send_and_wait` pays a full round trip per message; `send` queues the
+    message and resolves every queued future after one linger period plus
+    one round trip, like a producer accumulator flushing a batch.
+    """
+
+    def __init__(self, round_trip: float, linger: float):
+        self.round_trip = round_trip
+        self.linger = linger
+        self.messages: dict[str, list[bytes]] = defaultdict(list)
+        self.requests = 0
+        self._pending: list[tuple[str, bytes, asyncio.Future]] = []
+        self._flush_task: asyncio.Task | None = None
+
+    async def send_and_wait(self, topic: str, value: bytes):
+        self.requests += 1
+        await asyncio.sleep(self.round_trip)
+        self.messages[topic].append(value)
+
+    async def send(self, topic: str, value: bytes) -> asyncio.Future:
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((topic, value, future))
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush())
+        return future
+
+    async def _flush(self):
+        await asyncio.sleep(self.linger + self.round_trip)
+        pending, self._pending, self._flush_task = self._pending, [], None
+        self.requests += 1
+        for topic, value, future in pending:
+            self.messages[topic].append(value)
+            future.set_result(None)
+
+    async def stop(self):
+        pass
+
+
+def make_messages(count: int) -> list[tuple[str, dict]]:
+    return [
+        (
+            "insurance_logs",
+            {
+                "user_id": i % 10,
+                "action": "CREATE_INSURANCE_REQUEST",
+                "details": {"cargo_type": "Glass", "declared_value": 1000.0 + i},
+                "timestamp": "2024-11-22T12:34:56.789000",
+            },
+        )
+        for i in range(count)
+    ]
+
+
+async def run_sequential(messages: list[tuple[str, dict]]):
+    for topic, message in messages:
+        await kafka.produce_message(topic, message)
+
+
+async def run_batched(messages: list[tuple[str, dict]], batch_size: int):
+    for i in range(0, len(messages), batch_size):
+        await kafka.produce_messages(messages[i : i + batch_size])
+
+
+async def measure(name: str, broker: InMemoryBroker, coro) -> dict:
+    kafka.producer = broker
+    start = time.perf_counter()
+    await coro
+    elapsed = time.perf_counter() - start
+    sent = sum(len(values) for values in broker.messages.values())
+    return {
+        "path": name,
+        "messages": sent,
+        "broker_requests": broker.requests,
+        "seconds": round(elapsed, 4),
+        "messages_per_second": round(sent / elapsed, 1),
+    }
+
+
+async def main(args: argparse.Namespace):
+    logging.getLogger("kafka").setLevel(logging.WARNING)
+    round_trip = args.round_trip_ms / 1000
+    linger = args.linger_ms / 1000
+    messages = make_messages(args.messages)
+
+    results = [
+        await measure(
+            "send_and_wait per message",
+            InMemoryBroker(round_trip, linger),
+            run_sequential(make_messages(args.messages)),
+        )
+    ]
+    for batch_size in args.batch_sizes:
+        results.append(
+            await measure(
+                f"batched send, batch={batch_size}",
+                InMemoryBroker(round_trip, linger),
+                run_batched(messages, batch_size),
+            )
+        )
+
+    for result in results:
+        print(
+            f"{result['path']:<32} {result['messages']:>7} msgs "
+            f"{result['broker_requests']:>6} requests "
+            f"{result['seconds']:>8.3f}s {result['messages_per_second']:>10.1f} msg/s"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--round-trip-ms", type=float, default=1.0)
+    parser.add_argument("--linger-ms", type=float, default=5.0)
+    parser.add_argument(
+        "--batch-sizes", type=int, nargs="+", default=[5, 50, 500]
+    )
+    asyncio.run(main(parser.parse_args()))
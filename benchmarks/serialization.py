@@ -0,0 +1,135 @@
+"""
+Compare FastAPI's default response serialization with the orjson fast path.
+
+The default path is what FastAPI does for an endpoint returning a model:
+validate it again against `response_model`, convert it with
+`jsonable_encoder` and render it with the stdlib encoder. The fast path is
+`model_response`, which dumps the model once and renders it with orjson.
+Each path runs back to back for `--seconds` to keep the load sustained.
+
+    python -m benchmarks.serialization --seconds 3 --batch-size 100
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+from datetime import date, datetime
+
+for name, value in {
+    "POSTGRES_USER": "bench",
+    "POSTGRES_PASSWORD": "bench",
+    "POSTGRES_DB": "bench",
+    "POSTGRES_HOST": "localhost",
+    "POSTGRES_PORT": "5432",
+}.items():
+    os.environ.setdefault(name, value)
+
+from fastapi.responses import JSONResponse  # noqa: E402
+from fastapi.routing import APIRoute, serialize_response  # noqa: E402
+
+from app.core.config import settings  # noqa: E402
+from app.core.responses import model_response  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models.tariff import CargoType  # noqa: E402
+from app.schemas.insurance import InsuranceResponse  # noqa: E402
+from app.schemas.tariff import TariffResponse  # noqa: E402
+
+
+def find_route(path: str, method: str) -> APIRoute:
+    for route in app.routes:
+        if (
+            isinstance(route, APIRoute)
+            and route.path == path
+            and method in route.methods
+        ):
+            return route
+    raise LookupError(f"No route for {method} {path}")
+
+
+def make_response(i: int) -> InsuranceResponse:
+    tariff = TariffResponse(
+        id=1,
+        cargo_type=CargoType.GLASS,
+        rate=0.04,
+        valid_from=date(2024, 11, 21),
+        valid_to=date(2024, 12, 21),
+    )
+    return InsuranceResponse(
+        id=i,
+        cargo_type=CargoType.GLASS,
+        declared_value=1000.0 + i,
+        insurance_cost=(1000.0 + i) * 0.04,
+        timestamp=datetime(2024, 11, 22, 12, 34, 56, 789000),
+        user_id=i % 10,
+        tariff=tariff,
+    )
+
+
+async def default_path(route: APIRoute, content) -> bytes:
+    serialized = await serialize_response(
+        field=route.response_field,
+        response_content=content,
+        is_coroutine=True,
+    )
+    return JSONResponse(serialized).body
+
+
+async def fast_path(route: APIRoute, content) -> bytes:
+    return model_response(content).body
+
+
+async def measure(name: str, render, route: APIRoute, content, seconds: float) -> dict:
+    latencies = []
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        await render(route, content)
+        latencies.append(time.perf_counter() - start)
+
+    latencies.sort()
+    return {
+        "path": name,
+        "renders": len(latencies),
+        "renders_per_second": round(len(latencies) / sum(latencies), 1),
+        "p50_us": round(statistics.median(latencies) * 1e6, 1),
+        "p99_us": round(latencies[int(len(latencies) * 0.99)] * 1e6, 1),
+    }
+
+
+async def main(args: argparse.Namespace):
+    settings.fast_serialization = True
+    cases = [
+        (
+            "POST /insurance/",
+            find_route(f"{settings.api_prefix}/insurance/", "POST"),
+            make_response(1),
+        ),
+        (
+            f"POST /insurance/batch x{args.batch_size}",
+            find_route(f"{settings.api_prefix}/insurance/batch", "POST"),
+            [make_response(i) for i in range(args.batch_size)],
+        ),
+    ]
+
+    for case, route, content in cases:
+        if json.loads(await default_path(route, content)) != json.loads(
+            await fast_path(route, content)
+        ):
+            raise AssertionError(f"{case}: the paths render different documents")
+        for name, render in (("default", default_path), ("orjson", fast_path)):
+            result = await measure(name, render, route, content, args.seconds)
+            print(
+                f"{case:<28} {result['path']:<8} {result['renders']:>8} renders "
+                f"{result['renders_per_second']:>10.1f}/s "
+                f"p50 {result['p50_us']:>8.1f}us p99 {result['p99_us']:>8.1f}us"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--batch-size", type=int, default=100)
+    asyncio.run(main(parser.parse_args()))
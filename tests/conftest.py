@@ -0,0 +1,71 @@
+"""
+Shared fixtures for tests that drive the application against Postgres.
+
+Database tests only run against a dedicated database named by
+`TEST_POSTGRES_DB` (migrated with `alembic upgrade head`); the remaining
+POSTGRES_* settings come from the environment or `.env` as usual. Without
+it, or when the database is unreachable, those tests are skipped.
+"""
+
+import os
+
+TEST_DATABASE = os.environ.get("TEST_POSTGRES_DB")
+
+if TEST_DATABASE:
+    os.environ["POSTGRES_DB"] = TEST_DATABASE
+for name, value in {
+    "POSTGRES_USER": "test",
+    "POSTGRES_PASSWORD": "test",
+    "POSTGRES_DB": "test",
+    "POSTGRES_HOST": "localhost",
+    "POSTGRES_PORT": "5432",
+}.items():
+    os.environ.setdefault(name, value)
+
+# Keep background work that touches the database or Kafka out of the tests.
+os.environ.update(
+    {
+        "WARM_UP_ON_STARTUP": "false",
+        "TARIFF_LISTENER_ENABLED": "false",
+        "TARIFF_INDEX_CHECK_INTERVAL": "3600",
+        "PARTITION_MAINTENANCE_ENABLED": "false",
+        "IDEMPOTENCY_PURGE_ENABLED": "false",
+        "LOG_DELIVERY_MODE": "buffer",
+        "LOG_SPILL_ENABLED": "false",
+    }
+)
+
+import pytest  # noqa: E402
+from sqlalchemy import text  # noqa: E402
+from sqlalchemy.exc import DBAPIError  # noqa: E402
+
+from app.core import kafka  # noqa: E402
+from app.db.database import db  # noqa: E402
+from app.main import app  # noqa: E402
+from benchmarks.asgi import ASGIClient  # noqa: E402
+from benchmarks.kafka_producer import InMemoryBroker  # noqa: E402
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+async def database():
+    if not TEST_DATABASE:
+        pytest.skip("TEST_POSTGRES_DB is not set")
+    try:
+        async with db.engine.connect() as connection:
+            await connection.execute(text("SELECT 1"))
+    except (OSError, DBAPIError) as e:
+        await db.engine.dispose()
+        pytest.skip(f"Test database is unreachable: {e}")
+    return db
+
+
+@pytest.fixture
+async def client(database):
+    kafka.producer = InMemoryBroker(round_trip=0, linger=0)
+    async with ASGIClient(app) as client:
+        yield client
@@ -0,0 +1,32 @@
+"""
+Modules run with `python -m` must import on their own, outside `app.main`.
+"""
+
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+@pytest.mark.parametrize(
+    "module",
+    [
+        "app.services.idempotency",
+        "app.services.outbox",
+        "app.services.partitions",
+        "app.services.repricing",
+        "app.services.kafka",
+        "app.db.repository.logs",
+    ],
+)
+def test_module_imports_standalone(module):
+    result = subprocess.run(
+        [sys.executable, "-c", f"import {module}"],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+    )
+    assert result.returncode == 0, result.stderr
@@ -0,0 +1,64 @@
+import asyncio
+import uuid
+from datetime import datetime
+
+import pytest
+from sqlalchemy import func, select
+
+from app.core.config import settings
+from app.models.logs import ActionLog
+from app.services import kafka
+from app.services.kafka import LogPipeline, build_log_item, flush_logs_to_kafka
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_stop_with_full_queue_flushes_everything(monkeypatch):
+    flushed = []
+    flushing = asyncio.Event()
+    release = asyncio.Event()
+
+    async def flush(batch):
+        flushing.set()
+        await release.wait()
+        flushed.extend(batch)
+        return True
+
+    monkeypatch.setattr(kafka, "flush_logs_to_kafka", flush)
+    pipeline = LogPipeline(max_size=10, batch_size=5, flush_interval=60)
+    for i in range(10):
+        await pipeline.put({"id": i})
+    await flushing.wait()
+    for i in range(10, 15):
+        await pipeline.put({"id": i})
+    assert pipeline.queue.full()
+
+    # `stop` cannot enqueue its sentinel while the consumer holds a batch.
+    stopping = asyncio.create_task(pipeline.stop())
+    await asyncio.sleep(0)
+    release.set()
+    await asyncio.wait_for(stopping, timeout=5)
+
+    assert [item["id"] for item in flushed] == list(range(15))
+
+
+async def test_failed_copy_flush_rolls_back(database, monkeypatch):
+    async def produce_messages(messages):
+        raise ConnectionError("Kafka is down")
+
+    monkeypatch.setattr(kafka, "produce_messages", produce_messages)
+    action = f"test_copy_rollback_{uuid.uuid4().hex}"
+    timestamp = datetime.utcnow().isoformat()
+    # A batch at the threshold is written with COPY.
+    batch = [
+        build_log_item("test", action, {"n": i}, None, timestamp)
+        for i in range(settings.log_copy_threshold)
+    ]
+
+    assert not await flush_logs_to_kafka(batch)
+
+    async with database.session_factory() as session:
+        count = await session.scalar(
+            select(func.count()).where(ActionLog.action == action)
+        )
+    assert count == 0
@@ -0,0 +1,95 @@
+"""
+Pin the number of SQL statements the write endpoints execute per request.
+
+Generated columns are read back with INSERT/UPDATE ... RETURNING instead of
+a refresh after commit; these tests fail if a write path grows an extra
+round trip.
+"""
+
+from contextlib import contextmanager
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy import delete, func, select
+
+from app.core.config import settings
+from app.db.database import db
+from app.db.profiler import SQLProfile, current_sql_profile, install_sql_profiler
+from app.models.insurance import InsuranceRequest
+from app.models.tariff import Tariff
+from app.services.tariff_index import tariff_index
+
+pytestmark = pytest.mark.anyio
+
+API = settings.api_prefix
+
+
+@contextmanager
+def count_statements():
+    install_sql_profiler(db.engine)
+    profile = SQLProfile(slowest_limit=10)
+    token = current_sql_profile.set(profile)
+    try:
+        yield profile
+    finally:
+        current_sql_profile.reset(token)
+
+
+def statements(profile: SQLProfile) -> list[str]:
+    return [entry["sql"] for entry in profile.slowest()]
+
+
+async def first_free_date() -> date:
+    async with db.session_factory() as session:
+        latest = await session.scalar(select(func.max(Tariff.valid_to)))
+    return max(latest or date.today(), date.today()) + timedelta(days=1)
+
+
+async def test_tariff_writes_and_insurance_calculation(client):
+    valid_from = await first_free_date()
+    payload = {
+        "cargo_type": "Glass",
+        "rate": 0.02,
+        "valid_from": valid_from.isoformat(),
+        "valid_to": (valid_from + timedelta(days=30)).isoformat(),
+    }
+
+    # INSERT ... RETURNING for the tariff, UPDATE ... RETURNING for the version.
+    with count_statements() as profile:
+        response = await client.request("POST", f"{API}/tariffs/", json_body=payload)
+    assert response.status == 200, response.body
+    tariff_id = response.json()["id"]
+    assert profile.statements == 2, statements(profile)
+
+    insurance_id = None
+    try:
+        # SELECT of the tariff, the version bump and the UPDATE of the row.
+        with count_statements() as profile:
+            response = await client.request(
+                "PUT",
+                f"{API}/tariffs/{tariff_id}",
+                json_body={**payload, "rate": 0.03},
+            )
+        assert response.status == 200, response.body
+        assert response.json()["rate"] == 0.03
+        assert profile.statements == 3, statements(profile)
+
+        # The tariff comes from the in-process index, so only the INSERT runs.
+        await tariff_index.preload(force=True)
+        with count_statements() as profile:
+            response = await client.request(
+                "POST",
+                f"{API}/insurance/",
+                json_body={"cargo_type": "Glass", "declared_value": 1000},
+            )
+        assert response.status == 200, response.body
+        insurance_id = response.json()["id"]
+        assert profile.statements == 1, statements(profile)
+    finally:
+        if insurance_id is not None:
+            async with db.session_factory() as session:
+                await session.execute(
+                    delete(InsuranceRequest).where(InsuranceRequest.id == insurance_id)
+                )
+                await session.commit()
+        await client.request("DELETE", f"{API}/tariffs/{tariff_id}")